@@ -1 +1,13 @@
-from .parser import HarmonicsParser
+# The parsers are imported on first use, so that `import harmonics` stays fast
+_PARSERS = {
+    "HarmonicsParser": ".parser",
+    "IncrementalParser": ".incremental_parser",
+}
+
+
+def __getattr__(name):
+    if name in _PARSERS:
+        from importlib import import_module
+
+        return getattr(import_module(_PARSERS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,11 @@
 import os
 import re
-from lark import Lark, Token, Transformer, Discard
+from functools import lru_cache
+from typing import Iterable, List
+
+from lark import Token, Transformer, Discard
+
+from .parser_registry import get_parser, read_grammar
 
 CURRENT_FILEPATH = os.path.dirname(os.path.abspath(__file__))
 GRAMMAR_FILEPATH = os.path.join(CURRENT_FILEPATH, "chord_grammar.ebnf")
@@ -14,15 +19,16 @@ class SpaceTransformer(Transformer):
 class ChordParser:
     def __init__(self):
         self.grammar_file = GRAMMAR_FILEPATH
-        with open(self.grammar_file, "r") as f:
-            self.grammar = f.read()
-        self.parser = Lark(
-            self.grammar,
-            parser="earley",
-            propagate_positions=True,
+        self.parser = get_parser(
+            self.grammar_file,
+            parser="lalr",
             maybe_placeholders=False,
         )
 
+    @property
+    def grammar(self):
+        return read_grammar(self.grammar_file)
+
     def prepare_input(self, input_string):
         # Basic replacements
         input_string = input_string.replace("`", "").replace("%", "ø").replace("º", "o")
@@ -31,9 +37,20 @@ class ChordParser:
         return input_string
 
     def is_chord(self, input_string):
-        try:
-            tree = self.parser.parse(self.prepare_input(input_string))
-            tree = SpaceTransformer().transform(tree)
-            return True
-        except Exception as e:
-            return False
+        return _is_chord(input_string)
+
+    def is_chord_many(self, texts: Iterable[str]) -> List[bool]:
+        """Whether each text is a chord, validating each distinct text once."""
+        texts = list(texts)
+        results = {text: _is_chord(text) for text in dict.fromkeys(texts)}
+        return [results[text] for text in texts]
+
+
+@lru_cache(maxsize=4096)
+def _is_chord(input_string):
+    chord_parser = ChordParser()
+    try:
+        chord_parser.parser.parse(chord_parser.prepare_input(input_string))
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,82 @@
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional
+
+from harmonics.score_models import ChordItem
+
+
+class ChordTimeline:
+    """Chords sorted by time, for fast lookup of the chord active at a given time.
+
+    A chord is active from its onset until the onset of the next chord. The last
+    chord lasts for its own duration (in beats of its time signature).
+    Lookups are O(log n) with bisect, and `iter_at` walks sorted times in a
+    single merge pass.
+    """
+
+    def __init__(self, chords: List[ChordItem]):
+        self.chords = sorted(chords, key=lambda c: c.time)
+        self.times = [chord.time for chord in self.chords]
+        self.positions = sorted(
+            ((chord.measure_number, chord.beat), i)
+            for i, chord in enumerate(self.chords)
+        )
+        self.position_keys = [position for position, _ in self.positions]
+
+        self.end_time = None
+        self.end_position = None
+        if len(self.chords) > 0:
+            last_chord = self.chords[-1]
+            time_signature = last_chord.time_signature or (4, 4)
+            self.end_time = last_chord.time + last_chord.duration * 4 / time_signature[1]
+            last_measure, last_beat = self.position_keys[-1]
+            self.end_position = (
+                last_measure,
+                last_beat + self.chords[self.positions[-1][1]].duration,
+            )
+
+    def __len__(self) -> int:
+        return len(self.chords)
+
+    def __iter__(self) -> Iterator[ChordItem]:
+        return iter(self.chords)
+
+    def index_at(self, time: float) -> Optional[int]:
+        """Index (in time order) of the chord active at `time` in quarters, or None."""
+        index = bisect_right(self.times, time) - 1
+        if index < 0 or time >= self.end_time:
+            return None
+        return index
+
+    def at(self, time: float) -> Optional[ChordItem]:
+        """Chord active at `time` in quarters, or None."""
+        index = self.index_at(time)
+        return self.chords[index] if index is not None else None
+
+    def at_beat(self, measure_number: int, beat: float) -> Optional[ChordItem]:
+        """Chord active at a given beat of a measure, or None."""
+        position = (measure_number, beat)
+        index = bisect_right(self.position_keys, position) - 1
+        if index < 0 or position >= self.end_position:
+            return None
+        return self.chords[self.positions[index][1]]
+
+    def iter_at(self, times: Iterable[float]) -> Iterator[Optional[ChordItem]]:
+        """Yield the chord active at each time.
+
+        Consecutive increasing times are resolved by advancing a cursor
+        instead of searching again, so sorted input costs O(n + m).
+        """
+        index = -1
+        previous_time = None
+        n_chords = len(self.times)
+        for time in times:
+            if previous_time is None or time < previous_time:
+                index = bisect_right(self.times, time) - 1
+            else:
+                while index + 1 < n_chords and self.times[index + 1] <= time:
+                    index += 1
+            previous_time = time
+            if index < 0 or time >= self.end_time:
+                yield None
+            else:
+                yield self.chords[index]
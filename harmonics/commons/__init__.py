@@ -1,5 +1,32 @@
-from .to_mxl import to_mxl
-from .to_midi import to_midi
-from .to_audio import to_audio
-from .to_ern import to_ern
-from .from_mxl import from_mxl
+import sys
+from types import ModuleType
+
+# Exporters are imported on first use: they depend on music21 and symusic,
+# which are slow to import
+_EXPORTERS = {
+    "to_mxl": ".to_mxl",
+    "to_midi": ".to_midi",
+    "to_audio": ".to_audio",
+    "to_ern": ".to_ern",
+    "from_mxl": ".from_mxl",
+}
+
+
+class _CommonsPackage(ModuleType):
+    def __setattr__(self, name, value):
+        # Importing a submodule (e.g. `harmonics.commons.to_midi`) binds its name
+        # in this package to the module: keep the name bound to the function
+        if name in _EXPORTERS and isinstance(value, ModuleType):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _CommonsPackage
+
+
+def __getattr__(name):
+    if name in _EXPORTERS:
+        from importlib import import_module
+
+        return getattr(import_module(_EXPORTERS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -215,7 +215,9 @@ def map_spanner_type_to_technique(spanner_type):
 def process_measures(part, part_idx, track_name, state):
     """Process all measures in a part."""
     current_ts = None
-    for measure in part.recurse().getElementsByClass("Measure"):
+    measures = list(part.recurse().getElementsByClass("Measure"))
+    chord_texts = get_chord_texts(measures)
+    for measure in measures:
         measure_notes = []
         measure_number = measure.number if measure.number is not None else 1
         if measure.timeSignature is not None:
@@ -241,7 +243,9 @@ def process_measures(part, part_idx, track_name, state):
         measure_notes = process_voices(measure, measure_number, track_name, state)
 
         # Process comments and chord symbols
-        process_comments_and_chords(measure, measure_number, measure_notes, state)
+        process_comments_and_chords(
+            measure, measure_number, measure_notes, state, chord_texts
+        )
 
         state.notes.extend(measure_notes)
 
@@ -571,7 +575,19 @@ def map_expression_to_technique(technique_name):
     return mapping.get(technique_name)
 
 
-def process_comments_and_chords(measure, measure_number, measure_notes, state):
+def get_chord_texts(measures):
+    """Map the text of each text expression of the measures to whether it is a chord."""
+    texts = [
+        expression.content
+        for measure in measures
+        for expression in measure.getElementsByClass("TextExpression")
+    ]
+    return dict(zip(texts, ChordParser().is_chord_many(texts)))
+
+
+def process_comments_and_chords(
+    measure, measure_number, measure_notes, state, chord_texts=None
+):
     """Process text expressions for chord symbols and comments."""
     last_key = None
 
@@ -580,7 +596,10 @@ def process_comments_and_chords(measure, measure_number, measure_notes, state):
         text = expression.content
         offset = expression.offset + 1.0  # Convert to 1-indexed beat
 
-        is_chord = ChordParser().is_chord(text)
+        if chord_texts is not None and text in chord_texts:
+            is_chord = chord_texts[text]
+        else:
+            is_chord = ChordParser().is_chord(text)
 
         if is_chord:
             # Process chord symbol
@@ -325,8 +325,8 @@ def _organize_by_measure(score):
             measure_data[measure_number]["chords"] = []
         measure_data[measure_number]["chords"].append(chord)
 
-    # Process melody (notes)
-    for note in score.notes:
+    # Process melody (notes), as views of the rows of the note table
+    for note in score.note_table:
         measure_number = note.measure_number
         if measure_number not in measure_data:
             measure_data[measure_number] = {}
@@ -1,5 +1,7 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
 from symusic import Score, Track, Note, Tempo, TimeSignature
-import music21 as m21
 from .utils_techniques import apply_techniques_after, apply_techniques_before
 
 
@@ -16,37 +18,43 @@ def to_midi(filepath, score):
         track_program_map[track_key] = int(instrument.gm_number)
 
     note_events = []
-    notes = solve_continuation(score.notes)
-    for s in notes:
-        if not s.is_silence:
-            program = track_program_map.get(s.track_name, DEFAULT_MELODY_CHANNEL)
-            if isinstance(s.pitch, str):
-                note_event = [
-                    s.time,
-                    m21.pitch.Pitch(s.pitch).midi,
-                    s.duration,
-                    program,
-                    None,
-                    s.techniques,
-                ]
-                note_event = apply_techniques_before(
-                    s.global_techniques + s.techniques, note_event
-                )
-                note_events.append(note_event)
-            else:
-                for pitch in s.pitch:
-                    note_event = [
-                        s.time,
-                        m21.pitch.Pitch(pitch).midi,
-                        s.duration,
-                        program,
-                        None,
-                        s.techniques,
-                    ]
-                    note_event = apply_techniques_before(
-                        s.global_techniques + s.techniques, note_event
-                    )
-                    note_events.append(note_event)
+    table = score.note_table
+    program_of_track = [
+        track_program_map.get(track_name, DEFAULT_MELODY_CHANNEL)
+        for track_name in table.categories["track_name"].values
+    ]
+    track_codes = table.codes["track_name"].tolist()
+    technique_codes = table.codes["techniques"].tolist()
+    global_technique_codes = table.codes["global_techniques"].tolist()
+    techniques_of_code = table.categories["techniques"]
+    global_techniques_of_code = table.categories["global_techniques"]
+    # Note times are ticks of the score timebase when the score has one
+    ticks_per_quarter = score.ticks_per_quarter
+    if ticks_per_quarter is not None and (table.tick >= 0).all():
+        times = table.tick.tolist()
+    else:
+        ticks_per_quarter = None
+        times = table.time.tolist()
+    is_silence = table.is_silence.tolist()
+    pitch_offsets = table.pitch_offsets.tolist()
+    midi = table.midi.tolist()
+    for index, duration in solve_continuation_table(table):
+        if is_silence[index]:
+            continue
+        track_code = track_codes[index]
+        program = (
+            program_of_track[track_code]
+            if track_code >= 0
+            else DEFAULT_MELODY_CHANNEL
+        )
+        techniques = techniques_of_code[technique_codes[index]]
+        all_techniques = (
+            global_techniques_of_code[global_technique_codes[index]] + techniques
+        )
+        for pitch in midi[pitch_offsets[index] : pitch_offsets[index + 1]]:
+            note_event = [times[index], pitch, duration, program, None, techniques]
+            note_event = apply_techniques_before(all_techniques, note_event)
+            note_events.append(note_event)
 
     events_to_midi(
         note_events,
@@ -54,6 +62,7 @@ def to_midi(filepath, score):
         tempos=score.tempos,
         time_signatures=score.time_signatures,
         events=score.events,
+        ticks_per_quarter=ticks_per_quarter,
     )
 
 
@@ -130,7 +139,153 @@ def _process_tempo_events(events):
     return tempo_array, tempo_regions
 
 
-def _initialize_score(time_signatures=None, tempos=None, target_tpq=480):
+class PiecewiseCurve:
+    """
+    Integer value over time (in quarters) made of steps and linear ramps.
+
+    `steps` are (time, value) points sorted by time, each value holding until
+    the next point. `ramps` are (start time, end time, start value, end value)
+    regions sorted by start time, which override the steps between their
+    bounds (included); where regions overlap, the last one wins. Before the
+    first step and outside the ramps, the value is `default`.
+
+    The region covering a time only changes at the bounds of the regions, so
+    it is computed once at each bound and between consecutive bounds. Queries
+    are then binary searches, and `evaluate` runs them on a whole array of
+    times with NumPy.
+    """
+
+    default = 0
+
+    def __init__(self, steps=(), ramps=()):
+        self.step_times = [time for time, _ in steps]
+        self.step_values = [value for _, value in steps]
+        self.ramps = list(ramps)
+        self.bounds = sorted({time for ramp in self.ramps for time in ramp[:2]})
+        # Index of the ramp covering each bound, and the times between each
+        # bound and the next one (-1 for none)
+        self.ramp_at_bound = [self._covering_ramp(time) for time in self.bounds]
+        self.ramp_after_bound = [
+            self._covering_ramp((time + next_time) / 2)
+            for time, next_time in zip(self.bounds, self.bounds[1:])
+        ] + [-1]
+
+    def _covering_ramp(self, time) -> int:
+        covering = -1
+        for index, (start_time, end_time, _, _) in enumerate(self.ramps):
+            if start_time <= time <= end_time:
+                covering = index
+        return covering
+
+    def _ramp_index(self, time) -> int:
+        i = bisect_left(self.bounds, time)
+        if i < len(self.bounds) and self.bounds[i] == time:
+            return self.ramp_at_bound[i]
+        return self.ramp_after_bound[i - 1] if i > 0 else -1
+
+    def __call__(self, time) -> int:
+        """Value at `time`."""
+        ramp_index = self._ramp_index(time)
+        if ramp_index >= 0:
+            start_time, end_time, start_value, end_value = self.ramps[ramp_index]
+            if end_time == start_time:
+                return int(end_value)
+            progress = (time - start_time) / (end_time - start_time)
+            return int(start_value + (end_value - start_value) * progress)
+        i = bisect_right(self.step_times, time) - 1
+        return self.step_values[i] if i >= 0 else self.default
+
+    def evaluate(self, times) -> np.ndarray:
+        """Values at each of `times`, as `__call__`."""
+        times = np.asarray(times, dtype=np.float64)
+        values = np.full(len(times), self.default, dtype=np.int64)
+        if self.step_times:
+            i = np.searchsorted(np.array(self.step_times), times, side="right") - 1
+            values = np.where(
+                i >= 0, np.array(self.step_values)[np.maximum(i, 0)], values
+            )
+        if self.bounds:
+            bounds = np.array(self.bounds, dtype=np.float64)
+            i = np.searchsorted(bounds, times, side="left")
+            clipped = np.minimum(i, len(bounds) - 1)
+            ramp_index = np.where(
+                (i < len(bounds)) & (bounds[clipped] == times),
+                np.array(self.ramp_at_bound)[clipped],
+                np.where(
+                    i > 0, np.array(self.ramp_after_bound)[np.maximum(i - 1, 0)], -1
+                ),
+            )
+            in_ramp = ramp_index >= 0
+            if in_ramp.any():
+                start_time, end_time, start_value, end_value = (
+                    np.array(column, dtype=np.float64)[ramp_index[in_ramp]]
+                    for column in zip(*self.ramps)
+                )
+                length = end_time - start_time
+                progress = np.divide(
+                    times[in_ramp] - start_time,
+                    length,
+                    out=np.ones_like(length),
+                    where=length != 0,
+                )
+                values[in_ramp] = np.trunc(
+                    start_value + (end_value - start_value) * progress
+                )
+        return values
+
+
+class DynamicsCurve(PiecewiseCurve):
+    """MIDI velocity over time, from velocity and crescendo/diminuendo events."""
+
+    default = 80
+
+    @classmethod
+    def from_events(cls, events) -> "DynamicsCurve":
+        return cls(*_process_velocity_events(events))
+
+
+class TempoMap(PiecewiseCurve):
+    """Tempo over time, from tempo and accelerando/ritardando events."""
+
+    default = 120
+
+    @classmethod
+    def from_events(cls, events) -> "TempoMap":
+        return cls(*_process_tempo_events(events))
+
+    def changes(self, step_size=0.25):
+        """(time, tempo) of each tempo change, the ramps being sampled every
+        `step_size` quarters."""
+        times = []
+        previous_time = 0
+        for time in sorted({0, *self.step_times, *self.bounds}):
+            if time > previous_time:
+                first_step = int(previous_time / step_size)
+                times.extend(
+                    t * step_size for t in range(first_step, int(time / step_size))
+                )
+            times.append(time)
+            previous_time = time
+
+        changes = []
+        previous_tempo = self.default
+        for time, tempo in zip(times, self.evaluate(times).tolist()):
+            if tempo != previous_tempo:
+                changes.append((time, tempo))
+                previous_tempo = tempo
+        return changes
+
+
+def _midi_time(item, target_tpq, ticks_per_quarter=None):
+    """MIDI time of a timed item, from its tick in the score timebase if any."""
+    if ticks_per_quarter is not None and item.tick is not None:
+        return item.tick * target_tpq // ticks_per_quarter
+    return int(item.time * target_tpq)
+
+
+def _initialize_score(
+    time_signatures=None, tempos=None, target_tpq=480, ticks_per_quarter=None
+):
     """Initialize a Symusic Score with time signatures and tempos."""
     symusic_score = Score()
     symusic_score.tpq = target_tpq
@@ -139,7 +294,7 @@ def _initialize_score(time_signatures=None, tempos=None, target_tpq=480):
     if time_signatures:
         for ts in time_signatures:
             sym_ts = TimeSignature(
-                time=int(ts.time * target_tpq),
+                time=_midi_time(ts, target_tpq, ticks_per_quarter),
                 numerator=ts.time_signature[0],
                 denominator=ts.time_signature[1],
             )
@@ -152,7 +307,9 @@ def _initialize_score(time_signatures=None, tempos=None, target_tpq=480):
     # Add tempos
     if tempos:
         for t in tempos:
-            sym_tempo = Tempo(time=int(t.time * target_tpq), qpm=int(t.tempo))
+            sym_tempo = Tempo(
+                time=_midi_time(t, target_tpq, ticks_per_quarter), qpm=int(t.tempo)
+            )
             symusic_score.tempos.append(sym_tempo)
     else:
         symusic_score.tempos.append(Tempo(time=0, qpm=120))
@@ -167,87 +324,34 @@ def events_to_midi(
     time_signatures=None,
     quarter_value=1.0,
     events=None,
+    ticks_per_quarter=None,
 ):
-    """Converts a list of events to a MIDI file using Symusic."""
-    target_tpq = 480
+    """Converts a list of events to a MIDI file using Symusic.
 
-    # Process velocity and tempo events
-    velocities_array, crescendo_regions = _process_velocity_events(events)
-    tempo_array, tempo_regions = _process_tempo_events(events)
-
-    def get_current_velocity(time: float) -> int:
-        current_velocity = None
-        for velocity in velocities_array:
-            if velocity[0] <= time:
-                current_velocity = velocity[1]
-            else:
-                break
-
-        for cresc in crescendo_regions:
-            start_time, end_time, start_vel, end_vel = cresc
-            if start_time <= time <= end_time:
-                progress = (time - start_time) / (end_time - start_time)
-                current_velocity = int(start_vel + (end_vel - start_vel) * progress)
-
-        return current_velocity if current_velocity is not None else 80
-
-    def get_current_tempo(time: float) -> int:
-        current_tempo = None
-        for tempo in tempo_array:
-            if tempo[0] <= time:
-                current_tempo = tempo[1]
-            else:
-                break
-
-        for tempo_region in tempo_regions:
-            start_time, end_time, start_tempo, end_tempo = tempo_region
-            if start_time <= time <= end_time:
-                progress = (time - start_time) / (end_time - start_time)
-                current_tempo = int(start_tempo + (end_tempo - start_tempo) * progress)
+    With `ticks_per_quarter`, the times of the note events are integer ticks of
+    that resolution instead of quarters.
+    """
+    target_tpq = 480
 
-        return current_tempo if current_tempo is not None else 120
+    dynamics = DynamicsCurve.from_events(events)
+    tempo_map = TempoMap.from_events(events)
 
     # Initialize score
-    symusic_score = _initialize_score(time_signatures, tempos, target_tpq)
-
-    # Add tempo events
-    previous_time = 0
-    previous_tempo = 120
-    step_size = 0.25  # Quarter note divisions for smooth tempo changes
-
-    # Process all tempo changes including gradual ones
-    all_times = sorted(
-        set(
-            [0]
-            + [t[0] for t in tempo_array]
-            + [t for region in tempo_regions for t in [region[0], region[1]]]
-        )
+    symusic_score = _initialize_score(
+        time_signatures, tempos, target_tpq, ticks_per_quarter
     )
 
-    for time in all_times:
-        if time > previous_time:
-            # Add intermediate tempo points for smooth transitions
-            for t in range(int(previous_time / step_size), int(time / step_size)):
-                current_time = t * step_size
-                current_tempo = get_current_tempo(current_time)
-                if current_tempo != previous_tempo:
-                    tempo = Tempo(
-                        time=int(current_time * target_tpq), qpm=current_tempo
-                    )
-                    symusic_score.tempos.append(tempo)
-                    previous_tempo = current_tempo
-
-        current_tempo = get_current_tempo(time)
-        if current_tempo != previous_tempo:
-            tempo = Tempo(time=int(time * target_tpq), qpm=current_tempo)
-            symusic_score.tempos.append(tempo)
-            previous_tempo = current_tempo
-        previous_time = time
+    # Add tempo events, including the steps of gradual tempo changes
+    for time, tempo in tempo_map.changes():
+        symusic_score.tempos.append(Tempo(time=int(time * target_tpq), qpm=tempo))
 
     # Add events
     for event in events:
         if event.event_type == "tempo":
-            tempo = Tempo(time=int(event.time * target_tpq), qpm=int(event.event_value))
+            tempo = Tempo(
+                time=_midi_time(event, target_tpq, ticks_per_quarter),
+                qpm=int(event.event_value),
+            )
             symusic_score.tempos.append(tempo)
 
     # Group events by MIDI program
@@ -264,16 +368,24 @@ def events_to_midi(
 
         # Sort events by start time
         prog_events.sort(key=lambda x: x[0])
-        for event in prog_events:
 
-            if event[4] is None:
-                event[4] = get_current_velocity(time)
+        # Velocity at the onset (in quarters) of the notes without one
+        unset = [event for event in prog_events if event[4] is None]
+        onsets = np.array([event[0] for event in unset], dtype=np.float64)
+        if ticks_per_quarter is not None:
+            onsets /= ticks_per_quarter
+        for event, velocity in zip(unset, dynamics.evaluate(onsets).tolist()):
+            event[4] = velocity
 
+        for event in prog_events:
             event = apply_techniques_after(event[5], event)
             time, pitch, duration, _, velocity, techniques = event
 
             # Convert time and duration from event units to ticks
-            note_start_time = int((time / quarter_value) * target_tpq)
+            if ticks_per_quarter is None:
+                note_start_time = int((time / quarter_value) * target_tpq)
+            else:
+                note_start_time = time * target_tpq // ticks_per_quarter
             note_duration = int((duration / quarter_value) * target_tpq)
 
             # Create a Symusic Note object
@@ -320,3 +432,29 @@ def solve_continuation(notes):
             last_note_of_track[note.track_name] = note
 
     return result
+
+
+def solve_continuation_table(table):
+    """
+    Notes of a NoteTable that are not continuations, with their durations.
+
+    Same rules as `solve_continuation`, without modifying the notes: returns a
+    list of (row index, duration) where the duration of a note is extended by
+    the continuations that follow it in its track.
+    """
+    last_note_of_track = {}  # Track code -> position of its last note in result
+    result = []
+    track_codes = table.codes["track_name"].tolist()
+    is_continuation = table.is_continuation.tolist()
+    durations = table.categories["duration"].values
+    for index, duration_code in enumerate(table.codes["duration"].tolist()):
+        track_code = track_codes[index]
+        duration = durations[duration_code]
+        if is_continuation[index]:
+            if track_code in last_note_of_track:
+                position = last_note_of_track[track_code]
+                result[position] = (result[position][0], result[position][1] + duration)
+        else:
+            last_note_of_track[track_code] = len(result)
+            result.append((index, duration))
+    return result
@@ -373,15 +373,27 @@ def _add_note_to_measure(
         # Create new note or chord
         m21_note = _create_new_note(note, duration)
 
-        # Check if this note is tied to the next note
-        next_notes = [
-            n
-            for n in score.notes
-            if n.track_name == note.track_name
-            and n.voice_name == note.voice_name
-            and n.beat == note.beat + note.duration
-            and n.is_continuation
-        ]
+        # Check if this note is tied to the next note, with the exact ticks of
+        # the score timebase if the score has them
+        if note.tick is not None and note.duration_ticks is not None:
+            note_end = note.tick + note.duration_ticks
+            next_notes = [
+                n
+                for n in score.notes
+                if n.track_name == note.track_name
+                and n.voice_name == note.voice_name
+                and n.tick == note_end
+                and n.is_continuation
+            ]
+        else:
+            next_notes = [
+                n
+                for n in score.notes
+                if n.track_name == note.track_name
+                and n.voice_name == note.voice_name
+                and n.beat == note.beat + note.duration
+                and n.is_continuation
+            ]
 
         if next_notes:
             part_state.ref_note[(note.track_name, note.voice_name)] = m21_note
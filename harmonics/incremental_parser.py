@@ -0,0 +1,144 @@
+from typing import Dict, List, Optional, Tuple
+
+from lark import Token, Tree
+
+from .parser import HarmonicsParser
+from .profiling import count, span
+from .score import ScoreDocument
+from .transformer import transform_statement_line
+
+
+class CachedLine:
+    """Transformed statements of one source line."""
+
+    def __init__(self, trees: List[Tree]):
+        self.trees = trees
+        self.results: Optional[List] = None
+        self.is_declaration = any(
+            tree.data == "variable_declaration_line" for tree in trees
+        )
+        self.uses_variables = any(
+            token.type == "VARIABLE_CALLING"
+            for tree in trees
+            for token in tree.scan_values(lambda value: isinstance(value, Token))
+        )
+
+
+class IncrementalParser(HarmonicsParser):
+    """Parser that only re-parses the lines that changed since the last parse.
+
+    ERN statements fit on one line, so each normalised source line is parsed
+    and transformed on its own and cached. Parsing a new version of a document
+    reuses the cached lines and parses only the new or edited ones. Lines that
+    call variables are transformed again only when a variable declaration
+    changed.
+
+    Documents share the cached `Line` objects of their unchanged lines. Parsed
+    models are frozen (see `models.FrozenModel`): copy a line with
+    `model_copy(update=...)` to change it.
+
+    Useful for editors and correction loops that resubmit whole documents after
+    small edits. Use `parse` (and the `parse_to_*` methods) as with
+    `HarmonicsParser`.
+    """
+
+    def __init__(self, segmented=False):
+        """
+        `segmented` is forwarded to `HarmonicsParser`. Lines are always parsed
+        one by one into parse trees, so there is no `treeless` mode.
+        """
+        super().__init__(segmented=segmented)
+        self._lines: Dict[str, CachedLine] = {}
+        self._declarations: Tuple[str, ...] = ()
+        self._context = {}
+        self.parsed_lines = 0
+        self.reused_lines = 0
+
+    def parse(self, input_string: str) -> ScoreDocument:
+        with span("parse"):
+            with span("normalise"):
+                clean_input = self.prepare_input(input_string)
+            source_lines = [line.strip() for line in clean_input.split("\n")]
+
+            self.parsed_lines = 0
+            self.reused_lines = 0
+            cache = {}
+            numbered_lines = []
+            with span("lark parse"):
+                for line_number, source_line in enumerate(source_lines, start=1):
+                    if not source_line:
+                        continue
+                    cached = cache.get(source_line) or self._lines.get(source_line)
+                    if cached is None:
+                        cached = self._parse_line(source_line, clean_input)
+                        self.parsed_lines += 1
+                    else:
+                        self.reused_lines += 1
+                    cache[source_line] = cached
+                    numbered_lines.append((line_number, cached))
+            count("reused lines", self.reused_lines)
+
+            declarations = tuple(
+                source_line
+                for source_line, cached in cache.items()
+                if cached.is_declaration
+            )
+            declarations_changed = declarations != self._declarations
+            context = {} if declarations_changed else self._context
+
+            lines = []
+            with span("transform"):
+                for line_number, cached in numbered_lines:
+                    depends_on_declarations = (
+                        cached.is_declaration or cached.uses_variables
+                    )
+                    if cached.results is None or (
+                        declarations_changed and depends_on_declarations
+                    ):
+                        cached.results = self._transform(cached.trees, context)
+                    lines.extend(self._at_line(cached.results, line_number))
+
+            self._lines = cache
+            self._declarations = declarations
+            self._context = context
+            document = ScoreDocument(lines=lines)
+            count("lines", len(document.lines))
+        return document
+
+    def _parse_line(self, source_line: str, clean_input: str) -> CachedLine:
+        try:
+            tree = self.parser.parse(source_line + "\n")
+        except Exception:
+            # Parse the whole document to report the error at its position
+            self.parser.parse(clean_input)
+            raise
+        return CachedLine(
+            [
+                child.children[0]
+                for child in tree.children
+                if isinstance(child, Tree) and child.data == "line"
+            ]
+        )
+
+    def _transform(self, trees: List[Tree], context) -> List:
+        results = []
+        for tree in trees:
+            result = transform_statement_line(tree, context)
+            if result is not None:
+                results.append(result)
+        return results
+
+    def _at_line(self, results: List, line_number: int) -> List:
+        # Cached results were transformed with the line number of a previous version
+        return [
+            result
+            if getattr(result, "line_number", None) in (None, line_number)
+            else result.model_copy(update={"line_number": line_number})
+            for result in results
+        ]
+
+    def clear(self) -> None:
+        """Forget the cached lines."""
+        self._lines = {}
+        self._declarations = ()
+        self._context = {}
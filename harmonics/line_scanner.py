@@ -0,0 +1,139 @@
+"""
+Fast path for the most common lines of ERN documents.
+
+Melody lines (`m12 T1.v1 b1 C5 b2 E5 D5`) and harmony lines
+(`h12 b1 C: I b3 V7 ||`) make up most of real documents. `scan_line` reads the
+common shapes of these lines with precompiled regular expressions and builds
+their `Melody` / `Measure` models directly, without going through the Lark lexer
+and the tree transformers. It returns None for any other line (techniques in
+brackets, text comments, secondary dominants, chord alterations, ...), which is
+then parsed with Lark.
+
+The models built here must be equal to the ones of the Lark path, see
+`tests/test_line_scanner.py`.
+"""
+
+import re
+from typing import List, Optional
+
+from harmonics.constants import TECHNIQUE_DICT
+from harmonics.models import (
+    AbsoluteMelodyNote,
+    Chord,
+    ChordMelodyNote,
+    Continuation,
+    Key,
+    Line,
+    Measure,
+    Melody,
+    Silence,
+)
+from .token_tables import pitch_table
+from .transformer import transform_beat_indicator
+
+_ACCIDENTAL = r"(?:##|bb|b|#)"
+_NOTE = rf"[A-G]{_ACCIDENTAL}?\d+(?:tr|/~|[.!\-^>~])*"
+_BEAT_ITEMS = rf"{_NOTE}(?:\s+{_NOTE})*|[RrLl]"
+_MELODY_BEAT = rf"b(\d+(?:\.\d+)?|\d+\+\d+/\d+)\s+({_BEAT_ITEMS})"
+
+_KEY = r"[A-Ga-g](?:#+|b+)?:"
+_NUMERAL = r"Ger|Fr|It|Cad|NC|N|R|r|VII|III|IV|VI|II|V|I|vii|iii|iv|vi|ii|v|i"
+_CHORD = rf"{_ACCIDENTAL}?(?:{_NUMERAL})[°ø%+o]?(?:6/4|6/3|6/5|4/3|4/2|\d+)?"
+_HARMONY_ITEM = rf"b(\d+(?:\.\d+)?)\s+(?:({_KEY})\s*)?({_CHORD})|({_KEY})"
+
+MELODY_LINE = re.compile(
+    rf"m(\d+)(?:\s+T(\d+)(?:\.v(\d+))?)?((?:\s+{_MELODY_BEAT})+)"
+)
+MELODY_BEAT = re.compile(_MELODY_BEAT)
+NOTE = re.compile(rf"([A-G]{_ACCIDENTAL}?\d+)((?:tr|/~|[.!\-^>~])*)")
+PLAYING_STYLE = re.compile(r"tr|/~|[.!\-^>~]")
+
+HARMONY_LINE = re.compile(rf"h(\d+)((?:\s+(?:{_HARMONY_ITEM}))+)(?:\s+(\|\|))?")
+HARMONY_ITEM = re.compile(_HARMONY_ITEM)
+
+
+def _scan_beat_notes(beat_indicator: str, items: str) -> List:
+    beat, is_exact = transform_beat_indicator(beat_indicator)
+    if items in ("R", "r"):
+        return [Silence(beat=beat, is_exact=is_exact)]
+    if items in ("L", "l"):
+        return [Continuation(beat=beat, is_exact=is_exact)]
+    notes = []
+    for note, playing_styles in NOTE.findall(items):
+        techniques = [
+            TECHNIQUE_DICT[style][0] for style in PLAYING_STYLE.findall(playing_styles)
+        ]
+        notes.append(
+            AbsoluteMelodyNote(
+                note=pitch_table(note).note,
+                beat=beat,
+                techniques=techniques,
+                is_exact=is_exact,
+            )
+        )
+    if len(notes) == 1:
+        return notes
+    techniques = [technique for note in notes for technique in note.techniques]
+    return [
+        ChordMelodyNote(
+            beat=beat, notes=notes, techniques=techniques, is_exact=is_exact
+        )
+    ]
+
+
+def scan_melody_line(line: str) -> Optional[Melody]:
+    match = MELODY_LINE.fullmatch(line)
+    if match is None:
+        return None
+    measure_number, track, voice, content = match.groups()[:4]
+    notes = []
+    for beat_match in MELODY_BEAT.finditer(content):
+        notes.extend(_scan_beat_notes("b" + beat_match[1], beat_match[2]))
+    return Melody(
+        measure_number=int(measure_number),
+        track_name=f"T{track}" if track is not None else "T1",
+        voice_name=f"v{voice}" if voice is not None else "v1",
+        notes=notes,
+    )
+
+
+def scan_harmony_line(line: str, line_number: Optional[int]) -> Optional[Measure]:
+    match = HARMONY_LINE.fullmatch(line)
+    if match is None:
+        return None
+    beat_items = []
+    for beat, key, chord, key_change in HARMONY_ITEM.findall(match[2]):
+        if key_change:
+            beat_items.append(Key(key=key_change[:-1]))
+        else:
+            beat_items.append(
+                Chord(
+                    beat=float(beat),
+                    key=key[:-1] if key else None,
+                    chord="NC" if chord == "R" else chord,
+                )
+            )
+    return Measure(
+        measure_number=int(match[1]),
+        beat_items=beat_items,
+        phrase_boundary=match.groups()[-1],
+        line_number=line_number,
+    )
+
+
+def is_scanned_line(line: str) -> bool:
+    """Whether `scan_line` reads the prepared line, without building its model."""
+    if line.startswith("m"):
+        return MELODY_LINE.fullmatch(line) is not None
+    elif line.startswith("h"):
+        return HARMONY_LINE.fullmatch(line) is not None
+    return False
+
+
+def scan_line(line: str, line_number: Optional[int] = None) -> Optional[Line]:
+    """Model of a prepared melody or harmony line, or None for other lines."""
+    if line.startswith("m"):
+        return scan_melody_line(line)
+    elif line.startswith("h"):
+        return scan_harmony_line(line, line_number)
+    return None
@@ -1,16 +1,77 @@
 from typing import List, Optional, Union, Tuple, Any, Dict, Set
 from fractions import Fraction
-from pydantic import BaseModel as RawBaseModel, Field
-from .notes_utils import getPitchFromIntervalFromMinimallyModifiedScale
+from pydantic import BaseModel as RawBaseModel, ConfigDict, Field
+
+# Field defaults of each model, in field order, for `BaseModel.trusted`
+_trusted_defaults: Dict[type, Tuple[Dict[str, Any], Tuple[str, ...]]] = {}
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return frozenset((k, _hashable(v)) for k, v in value.items())
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_hashable(v) for v in value)
+    return value
 
 
 # Base model for all classes
 class BaseModel(RawBaseModel):
     def __hash__(self):  # make hashable BaseModel subclass
-        return hash(self.model_dump_json())
-
-
-class Line(BaseModel):
+        # Equal models have equal field values, so they get the same hash
+        return hash((type(self), _hashable(self.__dict__)))
+
+    @classmethod
+    def trusted(cls, **values):
+        """Build an instance from values that already have the field types,
+        without validation.
+
+        For the items the compiler creates by the thousand from parsed models.
+        Unlike `model_construct`, the defaults are computed once per class.
+        """
+        if cls not in _trusted_defaults:
+            defaults = {
+                name: (
+                    None
+                    if field.is_required()
+                    else field.get_default(call_default_factory=True)
+                )
+                for name, field in cls.model_fields.items()
+            }
+            mutable = tuple(
+                name
+                for name, value in defaults.items()
+                if isinstance(value, (list, dict, set))
+            )
+            _trusted_defaults[cls] = (defaults, mutable)
+        defaults, mutable = _trusted_defaults[cls]
+        # Updating a copy of the defaults keeps the fields in order
+        fields = dict(defaults)
+        fields.update(values)
+        for name in mutable:
+            if name not in values:
+                fields[name] = fields[name].copy()
+        instance = cls.__new__(cls)
+        object.__setattr__(instance, "__dict__", fields)
+        object.__setattr__(instance, "__pydantic_fields_set__", set(values))
+        object.__setattr__(instance, "__pydantic_extra__", None)
+        object.__setattr__(instance, "__pydantic_private__", None)
+        return instance
+
+
+class FrozenModel(BaseModel):
+    """Content of a parsed document.
+
+    Parsers share these models between documents (see `IncrementalParser`), so
+    they are never changed after construction: copy them with
+    `model_copy(update=...)` instead. This also applies to their lists.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+
+class Line(FrozenModel):
     """Base class for all lines in the document"""
 
     line_number: Optional[int] = Field(default=None)
@@ -21,7 +82,7 @@ class Line(BaseModel):
 # ==============================
 
 
-class MelodyNote(BaseModel):
+class MelodyNote(FrozenModel):
     beat: Fraction
     techniques: List[str] = []
     text_comment: Optional[str] = None
@@ -50,13 +111,13 @@ class Continuation(MelodyNote):
     octave: int = 0
 
 
-class Instrument(BaseModel):
+class Instrument(FrozenModel):
     track_name: str
     name: str
     gm_number: int
 
 
-class AccompanimentVoice(BaseModel):
+class AccompanimentVoice(FrozenModel):
     voice: int
     octave: Optional[int] = 0
     alteration: Optional[int] = 0
@@ -123,7 +184,7 @@ class MinorMode(Line):
     minor_mode: str
 
 
-class Event(BaseModel):
+class Event(FrozenModel):
     measure_number: int
     beat: Fraction
     event_type: str
@@ -140,12 +201,12 @@ class Instruments(Line):
 
 
 # Clef models
-class ClefType(BaseModel):
+class ClefType(FrozenModel):
     name: str  # treble, bass, alto, etc.
     octave_change: Optional[int] = None  # +1, -1, etc. for octave displacement
 
 
-class Clef(BaseModel):
+class Clef(FrozenModel):
     track_name: str
     clef_type: ClefType
     measure_number: Optional[int] = None
@@ -163,7 +224,7 @@ class ClefChange(Line):
 
 
 # New models for techniques
-class TechniqueRange(BaseModel):
+class TechniqueRange(FrozenModel):
     start_measure: int
     start_beat: float
     end_measure: int
@@ -181,17 +242,17 @@ class Technique(Line):
 # ==============================
 
 
-class Key(BaseModel):
+class Key(FrozenModel):
     key: str
 
 
-class PitchClassesAndRomanNumeral(BaseModel):
+class PitchClassesAndRomanNumeral(FrozenModel):
     pitch_classes: List[int]
     roman_numeral: str
     key_name: str
 
 
-class Chord(BaseModel):
+class Chord(FrozenModel):
     # beat_chord: WS BEAT_INDICATOR (WS key)? WS chord
     beat: float
     key: Optional[str] = None
@@ -206,7 +267,7 @@ BeatItem = Chord | Key  # Updated syntax for Python 3.10+
 # ==============================
 
 
-class BeatAndPitchClasses(BaseModel):
+class BeatAndPitchClasses(FrozenModel):
     beat: float
     pitch_classes: List[int]
     roman_numeral: str
@@ -220,7 +281,7 @@ class Measure(Line):
     phrase_boundary: Optional[str] = None
 
 
-class MeasureRange(BaseModel):
+class MeasureRange(FrozenModel):
     # measure_range: MEASURE_INDICATOR ( "-" MEASURE_INDICATOR )+
     measures: List[str]
 
@@ -232,14 +293,14 @@ class Repeat(Line):
     end_range: MeasureRange
 
 
-class Note(BaseModel):
+class Note(FrozenModel):
     # note: NOTELETTER ACCIDENTAL?
     noteletter: str
     accidental: Optional[str] = None
     techniques: List[str] = []
 
 
-class PedalEntry(BaseModel):
+class PedalEntry(FrozenModel):
     # pedal_entry: MEASURE_INDICATOR WS BEAT_INDICATOR
     measure_indicator: str
     beat_indicator: str
@@ -271,7 +332,7 @@ class VariableDeclaration(Line):
     variable_value: str
 
 
-class VariableCalling(BaseModel):
+class VariableCalling(FrozenModel):
     variable_name: str
 
 
@@ -0,0 +1,288 @@
+"""
+Columnar storage of the notes of a score.
+
+A `NoteTable` keeps the notes of a score as NumPy columns instead of a list of
+`NoteItem` objects: times, ticks, measure numbers and flags as numbers; durations,
+beats, chords, keys, time signatures, tracks, voices and techniques as integer
+codes into the table of their distinct values; and pitches as a flat array of
+spelling codes indexed by the `pitch_offsets` of each note (a note `i` has the
+pitches `pitch_codes[pitch_offsets[i]:pitch_offsets[i + 1]]`).
+
+`table[i]` is a `NoteRow`, a view of the row with the attributes of a
+`NoteItem`, without copying the row.
+"""
+
+from fractions import Fraction
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from harmonics.score_models import NoteItem
+from harmonics.token_tables import pitch_to_midi
+
+# Code of None in the coded columns
+NONE_CODE = -1
+
+
+def _key(value):
+    # Hashing a Fraction is much slower than hashing its two integers
+    if type(value) is Fraction:
+        return (value.numerator, value.denominator)
+    if type(value) is list:
+        return tuple(value)
+    return value
+
+
+class Categories:
+    """Distinct values of a coded column."""
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def code(self, value) -> int:
+        if value is None:
+            return NONE_CODE
+        key = _key(value)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.values)
+            self.values.append(tuple(value) if type(value) is list else value)
+        return code
+
+    def codes(self, values) -> np.ndarray:
+        """Codes of a column of values."""
+        get_code = self._codes.get
+        codes = [get_code(_key(value)) for value in values]
+        for i, code in enumerate(codes):
+            if code is None:
+                codes[i] = self.code(values[i])
+        return np.array(codes, dtype=np.int32)
+
+    def __getitem__(self, code: int):
+        if code == NONE_CODE:
+            return None
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+
+# Coded columns, and whether their values are lists
+CODED_COLUMNS = {
+    "duration": False,
+    "beat": False,
+    "chord": False,
+    "key": False,
+    "time_signature": False,
+    "voice_name": False,
+    "track_name": False,
+    "techniques": True,
+    "global_techniques": True,
+    "text_comment": False,
+}
+
+
+def _coded_property(name: str, is_list: bool):
+    def get(self):
+        value = self.table.categories[name][self.table.codes[name][self.index]]
+        if is_list and value is not None:
+            return list(value)
+        return value
+
+    return property(get)
+
+
+class NoteRow:
+    """View of a row of a `NoteTable`, with the attributes of a `NoteItem`."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table: "NoteTable", index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def time(self) -> Optional[float]:
+        time = self.table.time[self.index]
+        return None if np.isnan(time) else float(time)
+
+    @property
+    def tick(self) -> Optional[int]:
+        tick = int(self.table.tick[self.index])
+        return None if tick == NONE_CODE else tick
+
+    @property
+    def duration_ticks(self) -> Optional[int]:
+        duration_ticks = int(self.table.duration_ticks[self.index])
+        return None if duration_ticks == NONE_CODE else duration_ticks
+
+    @property
+    def measure_number(self) -> Optional[int]:
+        measure_number = int(self.table.measure_number[self.index])
+        return None if measure_number == NONE_CODE else measure_number
+
+    @property
+    def is_silence(self) -> bool:
+        return bool(self.table.is_silence[self.index])
+
+    @property
+    def is_continuation(self) -> bool:
+        return bool(self.table.is_continuation[self.index])
+
+    @property
+    def is_exact(self) -> bool:
+        return bool(self.table.is_exact[self.index])
+
+    @property
+    def pitch(self):
+        table = self.table
+        start, end = table.pitch_offsets[self.index : self.index + 2]
+        pitches = [table.pitch_names[code] for code in table.pitch_codes[start:end]]
+        if table.is_pitch_list[self.index]:
+            return pitches
+        return pitches[0] if pitches else None
+
+    @property
+    def midi(self) -> np.ndarray:
+        """MIDI numbers of the pitches of the note."""
+        start, end = self.table.pitch_offsets[self.index : self.index + 2]
+        return self.table.midi[start:end]
+
+    duration = _coded_property("duration", False)
+    beat = _coded_property("beat", False)
+    chord = _coded_property("chord", False)
+    key = _coded_property("key", False)
+    time_signature = _coded_property("time_signature", False)
+    voice_name = _coded_property("voice_name", False)
+    track_name = _coded_property("track_name", False)
+    techniques = _coded_property("techniques", True)
+    global_techniques = _coded_property("global_techniques", True)
+    text_comment = _coded_property("text_comment", False)
+
+    def to_note_item(self) -> NoteItem:
+        return NoteItem(
+            **{name: getattr(self, name) for name in NoteItem.model_fields}
+        )
+
+    def __repr__(self):
+        return f"NoteRow({self.index}, pitch={self.pitch!r}, time={self.time!r})"
+
+
+class NoteTable:
+    """Notes of a score, stored column by column."""
+
+    def __init__(self, notes: List[NoteItem] = ()):
+        self.pitch_names = Categories()
+        self.categories = {name: Categories() for name in CODED_COLUMNS}
+        self._midi: Optional[np.ndarray] = None
+
+        self.codes = {
+            name: self.categories[name].codes([getattr(note, name) for note in notes])
+            for name in CODED_COLUMNS
+        }
+        self.time = np.array(
+            [np.nan if note.time is None else note.time for note in notes],
+            dtype=np.float64,
+        )
+        self.tick, self.duration_ticks, self.measure_number = (
+            np.array(
+                [
+                    NONE_CODE if getattr(note, name) is None else getattr(note, name)
+                    for note in notes
+                ],
+                dtype=np.int64,
+            )
+            for name in ("tick", "duration_ticks", "measure_number")
+        )
+        self.is_silence = np.array([note.is_silence for note in notes], dtype=bool)
+        self.is_continuation = np.array(
+            [note.is_continuation for note in notes], dtype=bool
+        )
+        self.is_exact = np.array([note.is_exact for note in notes], dtype=bool)
+        self.is_pitch_list = np.array(
+            [isinstance(note.pitch, list) for note in notes], dtype=bool
+        )
+        # Pitches of all the notes, one after the other
+        spellings = []
+        pitch_counts = []
+        for note in notes:
+            if isinstance(note.pitch, list):
+                spellings.extend(note.pitch)
+                pitch_counts.append(len(note.pitch))
+            elif note.pitch is not None:
+                spellings.append(note.pitch)
+                pitch_counts.append(1)
+            else:
+                pitch_counts.append(0)
+        self.pitch_offsets = np.concatenate(
+            ([0], np.cumsum(pitch_counts, dtype=np.int64))
+        )
+        self.pitch_codes = self.pitch_names.codes(spellings)
+
+    def _fraction_column(self, name: str, part: str) -> np.ndarray:
+        values = np.array(
+            [getattr(value, part) for value in self.categories[name].values] + [0],
+            dtype=np.int64,
+        )
+        # NONE_CODE picks the trailing 0
+        return values[self.codes[name]]
+
+    @property
+    def duration_numerator(self) -> np.ndarray:
+        return self._fraction_column("duration", "numerator")
+
+    @property
+    def duration_denominator(self) -> np.ndarray:
+        return self._fraction_column("duration", "denominator")
+
+    @property
+    def beat_numerator(self) -> np.ndarray:
+        return self._fraction_column("beat", "numerator")
+
+    @property
+    def beat_denominator(self) -> np.ndarray:
+        """Denominators of the beats, 0 for notes without a beat."""
+        return self._fraction_column("beat", "denominator")
+
+    @classmethod
+    def from_notes(cls, notes: List[NoteItem]) -> "NoteTable":
+        return cls(notes)
+
+    def to_notes(self) -> List[NoteItem]:
+        return [row.to_note_item() for row in self]
+
+    @property
+    def midi(self) -> np.ndarray:
+        """MIDI number of each pitch of `pitch_codes`, computed once per
+        distinct spelling."""
+        if self._midi is None:
+            midi_of_names = np.array(
+                [pitch_to_midi(name) for name in self.pitch_names.values],
+                dtype=np.int16,
+            )
+            self._midi = (
+                midi_of_names[self.pitch_codes]
+                if len(self.pitch_codes)
+                else np.empty(0, dtype=np.int16)
+            )
+        return self._midi
+
+    def column(self, name: str) -> List[Any]:
+        """Values of a coded column, one per note."""
+        categories = self.categories[name]
+        return [categories[code] for code in self.codes[name]]
+
+    def __len__(self):
+        return len(self.time)
+
+    def __getitem__(self, index: int) -> NoteRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return NoteRow(self, index)
+
+    def __iter__(self) -> Iterator[NoteRow]:
+        for index in range(len(self)):
+            yield NoteRow(self, index)
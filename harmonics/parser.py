@@ -1,16 +1,24 @@
 import os
 import re
 from lark import Lark
-from music21.pitch import Pitch
 
-from .transformer import transform_document
-from .commons import to_mxl, to_midi, to_audio, to_ern, from_mxl
+from .parser_registry import get_parser, read_grammar
+from .profiling import count, span
+from .syntax_checker import check_syntax
+from .line_scanner import scan_line
+from .score import ScoreDocument
+from .transformer import (
+    line_transformer,
+    transform_document,
+    transform_numbered_lines,
+)
 from harmonics.score_models import Score
 
 CURRENT_FILEPATH = os.path.dirname(os.path.abspath(__file__))
 GRAMMAR_FILEPATH = os.path.join(CURRENT_FILEPATH, "grammar.ebnf")
 
 from lark import Lark, Token, Transformer, Discard
+from lark.exceptions import UnexpectedInput
 
 
 class SpaceTransformer(Transformer):
@@ -19,16 +27,36 @@ class SpaceTransformer(Transformer):
 
 
 class HarmonicsParser:
-    def __init__(self):
+    def __init__(self, treeless=False, segmented=False):
+        """
+        With `treeless=True`, lines are transformed by the LALR parser as they
+        are parsed, without building the parse tree of the whole document.
+
+        With `segmented=True`, the chords of the exported scores are voiced
+        segment by segment instead of by a single DP over the whole
+        progression, which is faster to re-compile after an edit (see
+        `ScoreDocument.get_progression`).
+        """
         self.grammar_file = GRAMMAR_FILEPATH
-        with open(self.grammar_file, "r") as f:
-            self.grammar = f.read()
-        self.parser = Lark(
-            self.grammar,
+        self.grammar = read_grammar(self.grammar_file)
+        self.treeless = treeless
+        self.segmented = segmented
+        self.parser = get_parser(
+            self.grammar_file,
             parser="lalr",
             propagate_positions=True,
             maybe_placeholders=False,
         )
+        # Lines found valid by `syntax_errors`, not parsed again in later checks
+        self._valid_lines = set()
+        self.treeless_parser = None
+        if treeless:
+            self.treeless_parser = get_parser(
+                self.grammar_file,
+                parser="lalr",
+                maybe_placeholders=False,
+                transformer=line_transformer,
+            )
 
     def prepare_input(self, input_string):
         # Basic replacements
@@ -54,32 +82,79 @@ class HarmonicsParser:
         return input_string + "\n"
 
     def parse(self, input_string):
-        import time
-
-        start_time = time.time()
-        clean_input = self.prepare_input(input_string)
-        tree = self.parser.parse(clean_input)
-        document = transform_document(tree)
-        end_time = time.time()
-        print(f"Document parsed and transformed in {end_time - start_time} seconds")
+        with span("parse"):
+            with span("normalise"):
+                clean_input = self.prepare_input(input_string)
+            if self.treeless:
+                line_transformer.reset()
+                with span("lark parse"):
+                    document = self.treeless_parser.parse(clean_input)
+            else:
+                document = self._parse_with_fast_path(clean_input)
+            count("lines", len(document.lines))
         return document
-    
+
+    def _parse_and_transform(self, clean_input):
+        with span("lark parse"):
+            tree = self.parser.parse(clean_input)
+        with span("transform"):
+            return transform_document(tree)
+
+    def _parse_with_fast_path(self, clean_input):
+        # Common melody and harmony lines are read by the line scanner, the
+        # other lines by Lark
+        source_lines = clean_input.split("\n")
+        scanned_lines = []
+        with span("scan lines"):
+            for line_number, line in enumerate(source_lines, start=1):
+                result = scan_line(line.strip(), line_number)
+                if result is not None:
+                    scanned_lines.append((line_number, result))
+        count("scanned lines", len(scanned_lines))
+        if len(scanned_lines) == 0:
+            return self._parse_and_transform(clean_input)
+
+        scanned_line_numbers = {line_number for line_number, _ in scanned_lines}
+        remaining_input = "\n".join(
+            "" if line_number in scanned_line_numbers else line
+            for line_number, line in enumerate(source_lines, start=1)
+        )
+        try:
+            with span("lark parse"):
+                tree = self.parser.parse(remaining_input)
+        except UnexpectedInput:
+            # Let Lark parse (or report errors on) the whole document, in case
+            # a scanned line continues the line before it
+            return self._parse_and_transform(clean_input)
+        with span("transform"):
+            lines = sorted(
+                scanned_lines + transform_numbered_lines(tree),
+                key=lambda line: line[0],
+            )
+        return ScoreDocument(lines=[line for _, line in lines])
+
+    def syntax_errors(self, input_string):
+        """Every syntax error of the document, found in a single parse."""
+        # Positions of tokens are enough to locate errors
+        parser = get_parser(
+            self.grammar_file, parser="lalr", maybe_placeholders=False
+        )
+        return check_syntax(
+            parser, self.prepare_input(input_string), valid_lines=self._valid_lines
+        )
+
     def syntax_error_report(self, input_string):
-        clean_input = self.prepare_input(input_string)
-        clean_lines = clean_input.split("\n")
-        errors = []
-        for line_number, line in enumerate(clean_lines):
-            try:
-                tree = self.parser.parse(line)
-            except Exception as e:
-                errors.append(f"- Error in line '{line}': {str(e).replace('at line 1,', f'at line {line_number},')}")
+        errors = self.syntax_errors(input_string)
         if len(errors) == 0:
             return None
-        return "\n".join(errors)
+        return "\n".join(str(error) for error in errors)
 
     def parse_to_score(self, input_string):
         if input_string.endswith(".mxl") or input_string.endswith(".musicxml"):
-            return from_mxl(input_string)
+            from .commons.from_mxl import from_mxl
+
+            with span("import mxl"):
+                return from_mxl(input_string)
         elif (
             input_string.endswith(".ern")
             or input_string.endswith(".erntxt")
@@ -96,30 +171,21 @@ class HarmonicsParser:
 
     def _parse_to_score_string(self, input_string):
         document = self.parse(input_string)
-        import time
-
-        start_time = time.time()
-        data = document.data
-        end_time = time.time()
-        print(f"Data extracted in {end_time - start_time} seconds")
-        start_time = time.time()
-        notes = document.notes
-        end_time = time.time()
-        print(f"Notes extracted in {end_time - start_time} seconds")
-        start_time = time.time()
-        events = document.events
+        compiled = document.compile(segmented=self.segmented)
+        data = compiled.data
         score = Score(
             chords=data.chords,
-            notes=notes,
+            notes=compiled.notes,
             time_signatures=data.time_signatures,
             tempos=data.tempos,
-            events=events,
+            events=compiled.events,
             instruments=data.instruments,
             composer=data.composer,
             title=data.title,
             clefs=data.clefs,
             key_signatures=data.key_signatures,
             measure_boundaries=data.measure_boundaries,
+            ticks_per_quarter=compiled.ticks_per_quarter,
         )
         return score
 
@@ -132,21 +198,33 @@ class HarmonicsParser:
         return score
 
     def parse_to_mxl(self, input_string, output_filename):
+        from .commons.to_mxl import to_mxl
+
         score = self.parse_to_score(input_string)
-        to_mxl(output_filename, score)
+        with span("export mxl"):
+            to_mxl(output_filename, score)
         return score
 
     def parse_to_ern(self, input_filename, output_filename):
+        from .commons.to_ern import to_ern
+
         score = self.parse_to_score(input_filename)
-        to_ern(output_filename, score)
+        with span("export ern"):
+            to_ern(output_filename, score)
         return score
 
     def parse_to_midi(self, input_string, output_filename):
+        from .commons.to_midi import to_midi
+
         score = self.parse_to_score(input_string)
-        to_midi(output_filename, score)
+        with span("export midi"):
+            to_midi(output_filename, score)
         return score
 
     def parse_to_audio(self, input_string, output_filename):
+        from .commons.to_audio import to_audio
+
         score = self.parse_to_score(input_string)
-        to_audio(output_filename, score)
+        with span("export audio"):
+            to_audio(output_filename, score)
         return score
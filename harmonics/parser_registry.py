@@ -0,0 +1,88 @@
+"""
+Process-wide registry of Lark parsers.
+
+Each grammar file is compiled once per process and the resulting `Lark`
+instance is shared by every `HarmonicsParser` and `ChordParser`. Lark parsers
+keep no state between `parse` calls, so the instances can be used from several
+threads; only their construction is serialized by a lock.
+
+LALR parse tables are also saved to a cache file named after the hash of the
+grammar and the parser options (in HARMONICS_CACHE_DIR, by default the
+`harmonics` folder of the user cache directory), so that new processes load
+the tables instead of compiling the grammar again. Cache files are pickles:
+they are only used from a directory that no other user can write to.
+"""
+
+import hashlib
+import os
+import stat
+import threading
+from typing import Dict, Tuple
+
+from lark import Lark
+
+
+def _user_cache_directory() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "harmonics")
+
+
+CACHE_DIRECTORY = os.environ.get("HARMONICS_CACHE_DIR") or _user_cache_directory()
+
+_parsers: Dict[Tuple, Lark] = {}
+_lock = threading.Lock()
+
+
+def read_grammar(grammar_filepath: str) -> str:
+    with open(grammar_filepath, "r") as f:
+        return f.read()
+
+
+def grammar_cache_path(grammar: str, options: Dict) -> str:
+    """Cache file of the parse tables of a grammar built with the given options."""
+    key = grammar + repr(sorted(options.items()))
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIRECTORY, f"lark_{digest}.cache")
+
+
+def is_private_directory(directory: str) -> bool:
+    """Create the directory for the current user only, and check that it is
+    owned by the current user and not writable by anyone else."""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    status = os.stat(directory)
+    if hasattr(os, "getuid") and status.st_uid != os.getuid():
+        return False
+    return not status.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _build_parser(grammar_filepath: str, options: Dict) -> Lark:
+    grammar = read_grammar(grammar_filepath)
+    if options.get("parser") == "lalr" and "transformer" not in options:
+        try:
+            if is_private_directory(CACHE_DIRECTORY):
+                cache = grammar_cache_path(grammar, options)
+                return Lark(grammar, cache=cache, **options)
+        except OSError:
+            pass
+    return Lark(grammar, **options)
+
+
+def get_parser(grammar_filepath: str, **options) -> Lark:
+    """Shared Lark parser for a grammar file, built on first use."""
+    key = (grammar_filepath, tuple(sorted(options.items(), key=lambda o: o[0])))
+    parser = _parsers.get(key)
+    if parser is None:
+        with _lock:
+            parser = _parsers.get(key)
+            if parser is None:
+                parser = _build_parser(grammar_filepath, options)
+                _parsers[key] = parser
+    return parser
+
+
+def clear_parsers() -> None:
+    """Forget the parsers built so far (cache files are kept)."""
+    with _lock:
+        _parsers.clear()
@@ -0,0 +1,199 @@
+"""
+Per-stage profiling hooks.
+
+The parser, the compiler, the harmonization and the exporters record their
+stages as nested spans (`span("lark parse")`) and their work as counters
+(`count("notes", n)`). Nothing is recorded unless a profiler is installed, and
+the hooks then cost a single global lookup.
+
+    with profile("trace.json") as profiler:
+        parser.parse_to_midi(document, "out.mid")
+    print(profiler.folded_stacks())
+
+`Profiler` is the built-in collector. It dumps its spans and counters as JSON,
+as a Chrome trace (opened as a flame graph by chrome://tracing, Perfetto or
+speedscope) or as folded stacks (`flamegraph.pl`). Subclass it and override
+`record` to send the spans somewhere else.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class SpanRecord(NamedTuple):
+    name: str
+    # Names of the enclosing spans, outermost first, ending with `name`
+    stack: Tuple[str, ...]
+    start: float  # Seconds since the profiler was created
+    duration: float  # Seconds
+    thread_id: int
+
+
+class Profiler:
+    """Collects the spans and counters of the stages it is installed for."""
+
+    def __init__(self):
+        self.spans: List[SpanRecord] = []
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str):
+        stack = self._stack()
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            duration = time.perf_counter() - start
+            self.record(
+                SpanRecord(
+                    name=name,
+                    stack=tuple(stack),
+                    start=start - self._origin,
+                    duration=duration,
+                    thread_id=threading.get_ident(),
+                )
+            )
+            stack.pop()
+
+    def record(self, span: SpanRecord) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def totals(self) -> Dict[str, float]:
+        """Total duration (s) of each span name."""
+        totals = defaultdict(float)
+        for span in self.spans:
+            totals[span.name] += span.duration
+        return dict(totals)
+
+    def to_dict(self) -> dict:
+        return {
+            "spans": [
+                {
+                    "name": span.name,
+                    "stack": list(span.stack),
+                    "start": span.start,
+                    "duration": span.duration,
+                    "thread_id": span.thread_id,
+                }
+                for span in self.spans
+            ],
+            "counters": dict(self.counters),
+        }
+
+    def to_json(self, filepath: Optional[str] = None) -> str:
+        """Spans and counters as JSON, written to `filepath` if given."""
+        text = json.dumps(self.to_dict(), indent=4)
+        if filepath is not None:
+            with open(filepath, "w") as f:
+                f.write(text)
+        return text
+
+    def chrome_trace(self) -> dict:
+        """Spans and counters in the Chrome trace event format."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": span.start * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": span.thread_id,
+            }
+            for span in self.spans
+        ]
+        end = max((span.start + span.duration for span in self.spans), default=0.0)
+        events.extend(
+            {
+                "name": name,
+                "ph": "C",
+                "ts": end * 1e6,
+                "pid": pid,
+                "args": {name: value},
+            }
+            for name, value in self.counters.items()
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_trace(self, filepath: str) -> None:
+        """Write the Chrome trace to `filepath`."""
+        with open(filepath, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def folded_stacks(self) -> str:
+        """Self time of each stack in microseconds, one `a;b;c 1234` line per
+        stack, as read by `flamegraph.pl` and speedscope."""
+        self_times = defaultdict(float)
+        for span in self.spans:
+            self_times[span.stack] += span.duration
+            if len(span.stack) > 1:
+                self_times[span.stack[:-1]] -= span.duration
+        return "\n".join(
+            f"{';'.join(stack)} {max(round(duration * 1e6), 0)}"
+            for stack, duration in self_times.items()
+        )
+
+
+_profiler: Optional[Profiler] = None
+_no_span = nullcontext()
+
+
+def get_profiler() -> Optional[Profiler]:
+    return _profiler
+
+
+def set_profiler(profiler: Optional[Profiler]) -> Optional[Profiler]:
+    """Install `profiler` (None to stop profiling), return the previous one."""
+    global _profiler
+    previous = _profiler
+    _profiler = profiler
+    return previous
+
+
+def span(name: str):
+    """Context manager recording the stage `name` in the installed profiler."""
+    if _profiler is None:
+        return _no_span
+    return _profiler.span(name)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add `n` to the counter `name` of the installed profiler."""
+    if _profiler is not None:
+        _profiler.count(name, n)
+
+
+@contextmanager
+def profile(trace_filepath: Optional[str] = None, profiler: Optional[Profiler] = None):
+    """Profile the stages run in the block.
+
+    The Chrome trace is written to `trace_filepath` at the end of the block if
+    given.
+    """
+    profiler = profiler if profiler is not None else Profiler()
+    previous = set_profiler(profiler)
+    try:
+        yield profiler
+    finally:
+        set_profiler(previous)
+        if trace_filepath is not None:
+            profiler.to_trace(trace_filepath)
@@ -1,9 +1,71 @@
-from .voicing import solveProgressionChords, generateHarmonization
+from .segments import (
+    SegmentCache,
+    generateParallelHarmonization,
+    generateSegmentedHarmonization,
+    getWorkerPool,
+    segmentCache,
+    shutdownWorkerPools,
+    splitSegments,
+)
+from .voicing import (
+    getRomanNumerals,
+    solveProgressionBeam,
+    solveProgressionChords,
+    generateHarmonization,
+    getBestHarmonization,
+)
 
 
 def generateBestHarmonization(
-    chords, closePosition=False, firstVoicing=None, lastVoicing=None, allowedUnisons=0
+    chords,
+    closePosition=False,
+    firstVoicing=None,
+    lastVoicing=None,
+    allowedUnisons=0,
+    engine="numpy",
+    beamWidth=None,
+    costThreshold=None,
+    segmentStarts=(),
+    executor=None,
+    workers=None,
 ):
+    """Best voicing of each chord of the progression.
+
+    With `beamWidth` or `costThreshold`, the progression is voiced with a
+    beam search (see `solveProgressionBeam`), which bounds time and memory on
+    long progressions but may miss the optimal voicing.
+
+    With an `executor` or a number of `workers`, the segments starting at
+    `segmentStarts` (key changes, phrase ends) are voiced independently, in
+    parallel (see `generateParallelHarmonization`). `firstVoicing` and
+    `lastVoicing` then fix the first and last chords of the progression, and
+    the beam search options apply to each segment.
+    """
+    if executor is not None or workers is not None:
+        return generateParallelHarmonization(
+            chords,
+            segmentStarts,
+            closePosition=closePosition,
+            allowedUnisons=allowedUnisons,
+            engine=engine,
+            executor=executor,
+            workers=workers,
+            firstVoicing=firstVoicing,
+            lastVoicing=lastVoicing,
+            beamWidth=beamWidth,
+            costThreshold=costThreshold,
+        )
+    if beamWidth is not None or costThreshold is not None:
+        progression, cost = solveProgressionBeam(
+            getRomanNumerals(chords),
+            closePosition=closePosition,
+            firstVoicing=firstVoicing,
+            lastVoicing=lastVoicing,
+            allowedUnisons=allowedUnisons,
+            beamWidth=beamWidth,
+            costThreshold=costThreshold,
+        )
+        return progression
 
     costTable = solveProgressionChords(
         chords,
@@ -11,6 +73,7 @@ def generateBestHarmonization(
         firstVoicing=firstVoicing,
         lastVoicing=lastVoicing,
         allowedUnisons=allowedUnisons,
+        engine=engine,
     )
-    progression, cost = next(generateHarmonization(costTable))
+    progression, cost = getBestHarmonization(costTable)
     return progression
@@ -0,0 +1,510 @@
+"""
+Integer cost engine for the voice-leading DP.
+
+Each voicing is encoded once as 4-tuples of diatonic step numbers and MIDI
+numbers (plus a few chord facts: root, seventh, pitch names). The rules of
+`voicing.progressionCost` and `voicing.chordCost` are then evaluated with
+integer arithmetic on those tuples instead of music21 `Interval` objects.
+`transitionCostMatrix` evaluates the same rules for all the voicing pairs of
+two chords at once with NumPy. Costs are identical to the music21 engine.
+"""
+
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+from ..token_tables import pitch_spelling
+from .enums import PartEnum, Rule
+from .voicing import (
+    applyRule,
+    getChordFromPitches,
+    getKeyFromString,
+    getLeadingTone,
+    isTriad,
+    verticalHorizontalMapping,
+)
+
+# (lower voice, upper voice) of the 6 vertical intervals, in IntervalV order
+_verticalPairs = [(i, j) for i in range(3) for j in range(i + 1, 4)]
+
+
+class VoicingInfo(NamedTuple):
+    diatonic: Tuple[int, int, int, int]
+    midi: Tuple[int, int, int, int]
+    pitchNames: Tuple[str, ...]
+    root: str
+    seventhIndex: int  # -1 when the chord has no seventh
+    cost: int  # Cost of the voicing alone (same as `voicing.chordCost`)
+
+
+class KeyInfo(NamedTuple):
+    tonic: str
+    dominant: str
+    leadingTone: str
+
+
+@lru_cache(maxsize=1024)
+def encodePitch(p):
+    """Return (diatonic step number, MIDI number) of a pitch name."""
+    spelling = pitch_spelling(p)
+    return spelling.diatonic, spelling.midi
+
+
+def _verticalCost(chord, pitchNames):
+    cost = 0
+    if isTriad(frozenset(pitchNames)):
+        if chord.inversion() < 2:
+            # In root postion and first inversion, double the root
+            if pitchNames.count(chord.root().name) <= 1:
+                cost += applyRule(Rule.VERTICAL_NOT_DOUBLINGROOT)
+    elif chord.seventh:
+        # `voicing.chordCost` compares a set to 4, so this always applies
+        cost += applyRule(Rule.VERTICAL_SEVENTH_MISSINGNOTE)
+    return cost
+
+
+@lru_cache(maxsize=8192)
+def getVoicingInfo(pitches):
+    """Cached method. Encodes a voicing for the integer engine."""
+    chord = getChordFromPitches(pitches)
+    encoded = [encodePitch(p) for p in pitches]
+    pitchNames = tuple(chord.pitchNames)
+    seventh = chord.seventh
+    return VoicingInfo(
+        diatonic=tuple(d for d, _ in encoded),
+        midi=tuple(m for _, m in encoded),
+        pitchNames=pitchNames,
+        root=chord.root().name,
+        seventhIndex=chord.pitches.index(seventh) if seventh else -1,
+        cost=_verticalCost(chord, list(pitchNames)),
+    )
+
+
+@lru_cache(maxsize=256)
+def getKeyInfo(key):
+    """Cached method. Pitch names used by the leading tone rule."""
+    k = getKeyFromString(key)
+    return KeyInfo(
+        tonic=k.tonic.name,
+        dominant=k.pitchFromDegree(5).name,
+        leadingTone=getLeadingTone(key).name,
+    )
+
+
+def _sign(x):
+    return (x > 0) - (x < 0)
+
+
+def _genericDirected(steps):
+    """music21 `GenericInterval.directed` from a diatonic distance."""
+    return steps + 1 if steps >= 0 else steps - 1
+
+
+def _isForbiddenMelodicInterval(steps, semitones):
+    """True for the simple names A2, A4, m7 and M7."""
+    if steps < 0:
+        steps, semitones = -steps, -semitones
+    octaves, simpleSteps = divmod(steps, 7)
+    simpleSemitones = semitones - 12 * octaves
+    if simpleSteps == 1:
+        return simpleSemitones == 3
+    if simpleSteps == 3:
+        return simpleSemitones == 6
+    if simpleSteps == 6:
+        return simpleSemitones == 10 or simpleSemitones == 11
+    # "D5" in `voicing.progressionCost` never matches music21's "d5"
+    return False
+
+
+def transitionCost(keyInfo, info1, info2):
+    """Cost of moving from voicing `info1` to `info2` (see `progressionCost`)."""
+    dia1, midi1 = info1.diatonic, info1.midi
+    dia2, midi2 = info2.diatonic, info2.midi
+    hSteps = [dia2[i] - dia1[i] for i in range(4)]
+    hSemitones = [midi2[i] - midi1[i] for i in range(4)]
+    hDirections = [_sign(s) for s in hSemitones]
+
+    cost = 0
+
+    # No duplicate chords
+    if dia1 == dia2 and midi1 == midi2:
+        cost += applyRule(Rule.IDENTICAL_VOICING)
+    # All voices in the same direction
+    elif hDirections[0] == hDirections[1] == hDirections[2] == hDirections[3]:
+        cost += applyRule(Rule.ALLVOICES_SAME_DIRECTION)
+
+    # Melodic intervals for individual voices
+    for steps, semitones in zip(hSteps, hSemitones):
+        if _isForbiddenMelodicInterval(steps, semitones):
+            cost += applyRule(Rule.MELODIC_INTERVAL_FORBIDDEN)
+        elif abs(semitones) > 12:
+            cost += applyRule(Rule.MELODIC_INTERVAL_BEYONDOCTAVE)
+        elif abs(semitones) > 7:
+            cost += applyRule(Rule.MELODIC_INTERVAL_BEYONDFIFTH)
+        elif abs(semitones) > 4:
+            cost += applyRule(Rule.MELODIC_INTERVAL_BEYONDTHIRD)
+        elif abs(semitones) > 2:
+            cost += applyRule(Rule.MELODIC_INTERVAL_BEYONDSECOND)
+
+    # Parallel motion and unisons
+    for i, (lower, upper) in enumerate(_verticalPairs):
+        steps1 = dia1[upper] - dia1[lower]
+        steps2 = dia2[upper] - dia2[lower]
+        hLowerIndex, hUpperIndex = verticalHorizontalMapping[i]
+        # Unison arrival
+        if steps2 == 0 and midi2[upper] == midi2[lower]:
+            if (
+                _genericDirected(hSteps[hLowerIndex]) != 2
+                and _genericDirected(hSteps[hUpperIndex]) != -2
+            ):
+                cost += applyRule(Rule.UNISON_BY_LEAP)
+        # Oblique motion is fine
+        elif hDirections[hLowerIndex] == 0 or hDirections[hUpperIndex] == 0:
+            continue
+        # GenericInterval.mod7 is 5 for fifths and 1 for unisons/octaves
+        mod7First, mod7Second = steps1 % 7 + 1, steps2 % 7 + 1
+        if mod7First == 5 and mod7Second == 5:
+            cost += applyRule(Rule.PARALLEL_FIFTH)
+        elif mod7First == 1 and mod7Second == 1:
+            cost += applyRule(Rule.PARALLEL_OCTAVE)
+
+    # Hidden octaves/fifths in extreme voices
+    bass, soprano = PartEnum.BASS, PartEnum.SOPRANO
+    if (
+        not (hSteps[bass] == 0 and hSemitones[bass] == 0)
+        and not (hSteps[soprano] == 0 and hSemitones[soprano] == 0)
+        and hDirections[bass] == hDirections[soprano]
+    ):
+        mod7BassSoprano = (dia2[soprano] - dia2[bass]) % 7 + 1
+        if mod7BassSoprano == 5:
+            cost += applyRule(Rule.HIDDEN_FIFTH)
+        elif mod7BassSoprano == 1:
+            cost += applyRule(Rule.HIDDEN_OCTAVE)
+
+    # Voice crossing
+    for i in range(3):
+        if midi2[i] > midi1[i + 1] or midi2[i + 1] < midi1[i]:
+            cost += applyRule(Rule.VOICE_CROSSING)
+
+    # Sevenths preparation
+    if info2.seventhIndex >= 0:
+        directed = _genericDirected(hSteps[info2.seventhIndex])
+        if directed != 1 and abs(directed) != 2:
+            cost += applyRule(Rule.SEVENTH_UNPREPARED)
+
+    # Sevenths resolution
+    if info1.seventhIndex >= 0:
+        directed = _genericDirected(hSteps[info1.seventhIndex])
+        if directed != 1 and directed != -2:
+            cost += applyRule(Rule.SEVENTH_UNRESOLVED)
+
+    # Leading tone resolution
+    leadingTone = keyInfo.leadingTone
+    if (
+        (info1.root == keyInfo.dominant or info1.root == leadingTone)
+        and info2.root == keyInfo.tonic
+        and leadingTone in info1.pitchNames
+    ):
+        index = info1.pitchNames.index(leadingTone)
+        steps, semitones = hSteps[index], hSemitones[index]
+        # Directed names "m2" and "M-3"
+        if not (steps == 1 and semitones == 1) and not (
+            steps == -2 and semitones == -4
+        ):
+            cost += applyRule(Rule.LEADINGTONE_UNRESOLVED)
+
+    return cost
+
+
+def progressionCost(key, pitches1, pitches2):
+    """Integer version of `voicing.progressionCost`."""
+    return transitionCost(
+        getKeyInfo(key), getVoicingInfo(pitches1), getVoicingInfo(pitches2)
+    )
+
+
+def chordCost(pitches):
+    """Integer version of `voicing.chordCost`."""
+    return getVoicingInfo(pitches).cost
+
+
+class VoicingBlock(NamedTuple):
+    """The voicings of one chord packed into arrays, one row per voicing."""
+
+    voicings: list
+    diatonic: np.ndarray  # (V, 4)
+    midi: np.ndarray  # (V, 4)
+    seventhIndex: np.ndarray  # (V,)
+    cost: np.ndarray  # (V,)
+    infos: list
+
+
+def packVoicings(voicings):
+    """Pack a list of voicings into a VoicingBlock."""
+    infos = [getVoicingInfo(v) for v in voicings]
+    return VoicingBlock(
+        voicings=list(voicings),
+        diatonic=np.array([i.diatonic for i in infos], dtype=np.int64).reshape(-1, 4),
+        midi=np.array([i.midi for i in infos], dtype=np.int64).reshape(-1, 4),
+        seventhIndex=np.array([info.seventhIndex for info in infos], dtype=np.int64),
+        cost=np.array([info.cost for info in infos], dtype=np.int64),
+        infos=infos,
+    )
+
+
+def _genericDirectedArray(steps):
+    return np.where(steps >= 0, steps + 1, steps - 1)
+
+
+def _rule(rule):
+    return int(applyRule(rule))
+
+
+def transitionCostMatrix(keyInfo, block1, block2):
+    """Costs of every transition from `block1` to `block2`, as a (V1, V2) array.
+
+    Same rules as `transitionCost`, evaluated with NumPy broadcasting.
+    """
+    dia1, midi1 = block1.diatonic, block1.midi
+    dia2, midi2 = block2.diatonic, block2.midi
+    n1, n2 = len(dia1), len(dia2)
+    rows, columns = np.arange(n1)[:, None], np.arange(n2)[None, :]
+    hSteps = dia2[None, :, :] - dia1[:, None, :]
+    hSemitones = midi2[None, :, :] - midi1[:, None, :]
+    hDirections = np.sign(hSemitones)
+
+    cost = np.zeros((n1, n2), dtype=np.int64)
+
+    # No duplicate chords / All voices in the same direction
+    identical = np.all((hSteps == 0) & (hSemitones == 0), axis=2)
+    sameDirection = np.all(hDirections == hDirections[:, :, :1], axis=2)
+    cost += np.where(
+        identical,
+        _rule(Rule.IDENTICAL_VOICING),
+        np.where(sameDirection, _rule(Rule.ALLVOICES_SAME_DIRECTION), 0),
+    )
+
+    # Melodic intervals for individual voices
+    descending = hSteps < 0
+    steps = np.where(descending, -hSteps, hSteps)
+    semitones = np.where(descending, -hSemitones, hSemitones)
+    octaves, simpleSteps = np.divmod(steps, 7)
+    simpleSemitones = semitones - 12 * octaves
+    forbidden = (
+        ((simpleSteps == 1) & (simpleSemitones == 3))
+        | ((simpleSteps == 3) & (simpleSemitones == 6))
+        | ((simpleSteps == 6) & ((simpleSemitones == 10) | (simpleSemitones == 11)))
+    )
+    size = np.abs(hSemitones)
+    cost += np.select(
+        [forbidden, size > 12, size > 7, size > 4, size > 2],
+        [
+            _rule(Rule.MELODIC_INTERVAL_FORBIDDEN),
+            _rule(Rule.MELODIC_INTERVAL_BEYONDOCTAVE),
+            _rule(Rule.MELODIC_INTERVAL_BEYONDFIFTH),
+            _rule(Rule.MELODIC_INTERVAL_BEYONDTHIRD),
+            _rule(Rule.MELODIC_INTERVAL_BEYONDSECOND),
+        ],
+        0,
+    ).sum(axis=2)
+
+    # Parallel motion and unisons
+    hGeneric = _genericDirectedArray(hSteps)
+    for i, (lower, upper) in enumerate(_verticalPairs):
+        hLowerIndex, hUpperIndex = verticalHorizontalMapping[i]
+        unison = (
+            (dia2[:, upper] == dia2[:, lower]) & (midi2[:, upper] == midi2[:, lower])
+        )[None, :]
+        unisonByLeap = (
+            unison
+            & (hGeneric[:, :, hLowerIndex] != 2)
+            & (hGeneric[:, :, hUpperIndex] != -2)
+        )
+        cost += np.where(unisonByLeap, _rule(Rule.UNISON_BY_LEAP), 0)
+        oblique = (hDirections[:, :, hLowerIndex] == 0) | (
+            hDirections[:, :, hUpperIndex] == 0
+        )
+        checked = unison | ~oblique
+        mod7First = ((dia1[:, upper] - dia1[:, lower]) % 7 + 1)[:, None]
+        mod7Second = ((dia2[:, upper] - dia2[:, lower]) % 7 + 1)[None, :]
+        cost += np.where(
+            checked & (mod7First == 5) & (mod7Second == 5),
+            _rule(Rule.PARALLEL_FIFTH),
+            0,
+        )
+        cost += np.where(
+            checked & (mod7First == 1) & (mod7Second == 1),
+            _rule(Rule.PARALLEL_OCTAVE),
+            0,
+        )
+
+    # Hidden octaves/fifths in extreme voices
+    bass, soprano = PartEnum.BASS, PartEnum.SOPRANO
+    similarMotion = (
+        ~((hSteps[:, :, bass] == 0) & (hSemitones[:, :, bass] == 0))
+        & ~((hSteps[:, :, soprano] == 0) & (hSemitones[:, :, soprano] == 0))
+        & (hDirections[:, :, bass] == hDirections[:, :, soprano])
+    )
+    mod7BassSoprano = ((dia2[:, soprano] - dia2[:, bass]) % 7 + 1)[None, :]
+    cost += np.where(
+        similarMotion & (mod7BassSoprano == 5), _rule(Rule.HIDDEN_FIFTH), 0
+    )
+    cost += np.where(
+        similarMotion & (mod7BassSoprano == 1), _rule(Rule.HIDDEN_OCTAVE), 0
+    )
+
+    # Voice crossing
+    for i in range(3):
+        crossing = (midi2[None, :, i] > midi1[:, None, i + 1]) | (
+            midi2[None, :, i + 1] < midi1[:, None, i]
+        )
+        cost += np.where(crossing, _rule(Rule.VOICE_CROSSING), 0)
+
+    # Sevenths preparation
+    seventh2 = block2.seventhIndex
+    directed = hGeneric[rows, columns, np.maximum(seventh2, 0)[None, :]]
+    unprepared = (seventh2 >= 0)[None, :] & (directed != 1) & (np.abs(directed) != 2)
+    cost += np.where(unprepared, _rule(Rule.SEVENTH_UNPREPARED), 0)
+
+    # Sevenths resolution
+    seventh1 = block1.seventhIndex
+    directed = hGeneric[rows, columns, np.maximum(seventh1, 0)[:, None]]
+    unresolved = (seventh1 >= 0)[:, None] & (directed != 1) & (directed != -2)
+    cost += np.where(unresolved, _rule(Rule.SEVENTH_UNRESOLVED), 0)
+
+    # Leading tone resolution
+    leadingTone = keyInfo.leadingTone
+    leadingToneIndex = np.array(
+        [
+            info.pitchNames.index(leadingTone)
+            if (info.root == keyInfo.dominant or info.root == leadingTone)
+            and leadingTone in info.pitchNames
+            else -1
+            for info in block1.infos
+        ],
+        dtype=np.int64,
+    )
+    toTonic = np.array([i.root == keyInfo.tonic for i in block2.infos], dtype=bool)
+    if n1 > 0 and n2 > 0 and (leadingToneIndex >= 0).any() and toTonic.any():
+        index = np.maximum(leadingToneIndex, 0)[:, None]
+        steps = hSteps[rows, columns, index]
+        semitones = hSemitones[rows, columns, index]
+        resolved = ((steps == 1) & (semitones == 1)) | (
+            (steps == -2) & (semitones == -4)
+        )
+        unresolved = (leadingToneIndex >= 0)[:, None] & toTonic[None, :] & ~resolved
+        cost += np.where(unresolved, _rule(Rule.LEADINGTONE_UNRESOLVED), 0)
+
+    return cost
+
+
+def solveVoicings(voicingsPerChord, keys):
+    """DP over the voicings of each chord, one transition cost matrix per step.
+
+    `keys[i]` is the key used for the transition from chord i to chord i + 1.
+    Returns the same cost table as `voicing.solveProgression`.
+    """
+    costTable = [{} for _ in voicingsPerChord]
+    previous = None
+    previousCosts = None
+    for i, voicings in enumerate(voicingsPerChord):
+        block = packVoicings(list(dict.fromkeys(voicings)))
+        if i == 0:
+            for v, cost in zip(block.voicings, block.cost.tolist()):
+                costTable[0][v] = (cost, None)
+        elif len(previous.voicings) == 0 or previousCosts is None:
+            # Nothing to come from: same result as the scalar DP
+            for v, cost in zip(block.voicings, block.cost.tolist()):
+                costTable[i][v] = (float("inf") + cost, None)
+        else:
+            matrix = transitionCostMatrix(getKeyInfo(keys[i - 1]), previous, block)
+            totals = previousCosts[:, None] + matrix
+            # argmin keeps the first minimum, like the strict `<` of the scalar DP
+            bestIndices = np.argmin(totals, axis=0)
+            bestCosts = totals[bestIndices, np.arange(len(block.voicings))]
+            for v, bestIndex, bestCost, cost in zip(
+                block.voicings,
+                bestIndices.tolist(),
+                bestCosts.tolist(),
+                block.cost.tolist(),
+            ):
+                costTable[i][v] = (bestCost + cost, previous.voicings[bestIndex])
+        layerCosts = [cost for cost, _ in costTable[i].values()]
+        if any(cost == float("inf") for cost in layerCosts):
+            previousCosts = None
+        else:
+            previousCosts = np.array(layerCosts, dtype=np.int64)
+        previous = block
+    return costTable
+
+
+def _subBlock(block, indices):
+    return VoicingBlock(
+        voicings=[block.voicings[i] for i in indices],
+        diatonic=block.diatonic[indices],
+        midi=block.midi[indices],
+        seventhIndex=block.seventhIndex[indices],
+        cost=block.cost[indices],
+        infos=[block.infos[i] for i in indices],
+    )
+
+
+def _selectBeam(costs, beamWidth, costThreshold):
+    """Indices of the states to keep, in their original order."""
+    kept = np.arange(len(costs))
+    if costThreshold is not None and len(costs) > 0:
+        kept = kept[costs <= costs.min() + costThreshold]
+    if beamWidth is not None and len(kept) > beamWidth:
+        order = np.argsort(costs[kept], kind="stable")[:beamWidth]
+        kept = np.sort(kept[order])
+    return kept
+
+
+def solveVoicingsBeam(
+    voicingsPerChord, keys, beamWidth=None, costThreshold=None, pruneForbidden=True
+):
+    """Beam search over the voicings of each chord.
+
+    At each step only the kept states are extended. Back-pointers are stored
+    as one int32 array per chord instead of a dict of voicings.
+    Returns (progression, cost).
+    """
+    forbidden = _rule(Rule.MELODIC_INTERVAL_FORBIDDEN)
+    layers = []
+    backPointers = []
+    previous = None
+    kept = None
+    costs = None
+    for i, voicings in enumerate(voicingsPerChord):
+        block = packVoicings(list(dict.fromkeys(voicings)))
+        if len(block.voicings) == 0:
+            raise ValueError(f"No voicing for chord {i}")
+        if i == 0:
+            costs = block.cost.copy()
+            backPointers.append(np.full(len(block.voicings), -1, dtype=np.int32))
+        else:
+            matrix = transitionCostMatrix(getKeyInfo(keys[i - 1]), previous, block)
+            totals = costs[kept][:, None] + matrix
+            if pruneForbidden:
+                allowed = matrix < forbidden
+                # Keep forbidden transitions for voicings that have nothing else
+                allowed |= ~allowed.any(axis=0)[None, :]
+                masked = np.where(allowed, totals, np.iinfo(np.int64).max)
+            else:
+                masked = totals
+            best = np.argmin(masked, axis=0)
+            costs = totals[best, np.arange(len(block.voicings))] + block.cost
+            # Back-pointers index the full previous layer
+            backPointers.append(kept[best].astype(np.int32))
+        layers.append(block.voicings)
+        kept = _selectBeam(costs, beamWidth, costThreshold)
+        previous = _subBlock(block, kept)
+
+    current = int(np.argmin(costs))
+    cost = int(costs[current])
+    progression = []
+    for i in reversed(range(len(layers))):
+        progression.append(layers[i][current])
+        current = int(backPointers[i][current])
+    return list(reversed(progression)), cost
@@ -0,0 +1,284 @@
+"""
+Segmented harmonization.
+
+A progression is split into segments (at key changes, phrase ends, or fixed
+windows) that are voiced one after the other. Each segment is solved with the
+last voicing of the previous segment as `firstVoicing`, so voice leading
+across segment boundaries is still costed. Solved segments are cached by
+their chords and boundary voicing: after an edit, only the edited segment and
+the segments whose boundary voicing changed are voiced again.
+
+Segments separated by hard boundaries (key changes, phrase ends) can also be
+voiced independently of each other, in parallel over a process pool
+(`generateParallelHarmonization`).
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ..profiling import count
+from .voicing import (
+    getBestHarmonization,
+    getRomanNumerals,
+    solveProgressionBeam,
+    solveProgressionChords,
+)
+
+
+class SegmentCache:
+    """Bounded LRU cache of voiced segments."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            count("segment cache hits")
+            return self._items[key]
+        self.misses += 1
+        count("segment cache misses")
+        return None
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+segmentCache = SegmentCache()
+
+
+def splitSegments(n_chords, segmentStarts=(), window=None):
+    """(start, end) index ranges of the segments of a progression.
+
+    A segment starts at 0, at each index of `segmentStarts`, and every
+    `window` chords within a segment when `window` is given.
+    """
+    if n_chords == 0:
+        return []
+    starts = sorted({0, *(s for s in segmentStarts if 0 < s < n_chords)})
+    ends = starts[1:] + [n_chords]
+    segments = []
+    for start, end in zip(starts, ends):
+        step = window or (end - start)
+        for segmentStart in range(start, end, step):
+            segments.append((segmentStart, min(segmentStart + step, end)))
+    return segments
+
+
+def _segmentKey(
+    chords, boundaryVoicing, closePosition, allowedUnisons, engine, options=()
+):
+    return (
+        tuple((chord.chord, chord.key) for chord in chords),
+        boundaryVoicing,
+        closePosition,
+        allowedUnisons,
+        engine,
+    ) + tuple(options)
+
+
+def solveSegment(
+    chords,
+    boundaryVoicing=None,
+    closePosition=False,
+    allowedUnisons=0,
+    engine="numpy",
+    firstVoicing=None,
+    lastVoicing=None,
+    beamWidth=None,
+    costThreshold=None,
+):
+    """Best voicings of a segment.
+
+    With a `boundaryVoicing`, `chords[0]` is the last chord of the previous
+    segment and is fixed to that voicing; it is not part of the result.
+    `firstVoicing` and `lastVoicing` fix the voicings of the first and last
+    chords of the segment. With `beamWidth` or `costThreshold`, the segment is
+    voiced with a beam search (see `solveProgressionBeam`).
+    """
+    if boundaryVoicing is not None:
+        firstVoicing = boundaryVoicing
+    if beamWidth is not None or costThreshold is not None:
+        progression, _ = solveProgressionBeam(
+            getRomanNumerals(chords),
+            closePosition=closePosition,
+            firstVoicing=firstVoicing,
+            lastVoicing=lastVoicing,
+            allowedUnisons=allowedUnisons,
+            beamWidth=beamWidth,
+            costThreshold=costThreshold,
+        )
+    else:
+        costTable = solveProgressionChords(
+            chords,
+            closePosition=closePosition,
+            firstVoicing=firstVoicing,
+            lastVoicing=lastVoicing,
+            allowedUnisons=allowedUnisons,
+            engine=engine,
+        )
+        progression, _ = getBestHarmonization(costTable)
+    return progression[1:] if boundaryVoicing is not None else progression
+
+
+def generateSegmentedHarmonization(
+    chords,
+    segmentStarts=(),
+    window=None,
+    closePosition=False,
+    allowedUnisons=0,
+    engine="numpy",
+    cache=segmentCache,
+):
+    """Best voicing of each chord, voicing the progression segment by segment.
+
+    Segments are given by `splitSegments(len(chords), segmentStarts, window)`.
+    Pass `cache=None` to disable the segment cache.
+    """
+    progression = []
+    for start, end in splitSegments(len(chords), segmentStarts, window):
+        boundaryVoicing = progression[-1] if progression else None
+        segment = chords[start - 1 : end] if boundaryVoicing else chords[start:end]
+        key = _segmentKey(
+            segment, boundaryVoicing, closePosition, allowedUnisons, engine
+        )
+        voicings = cache.get(key) if cache is not None else None
+        if voicings is None:
+            voicings = solveSegment(
+                segment, boundaryVoicing, closePosition, allowedUnisons, engine
+            )
+            if cache is not None:
+                cache.put(key, voicings)
+        progression.extend(voicings)
+    return progression
+
+
+def _solveIndependentSegment(task):
+    chords, closePosition, allowedUnisons, engine, options = task
+    firstVoicing, lastVoicing, beamWidth, costThreshold = options or (None,) * 4
+    return solveSegment(
+        chords,
+        None,
+        closePosition,
+        allowedUnisons,
+        engine,
+        firstVoicing=firstVoicing,
+        lastVoicing=lastVoicing,
+        beamWidth=beamWidth,
+        costThreshold=costThreshold,
+    )
+
+
+# Process pools of generateParallelHarmonization, by number of workers
+_workerPools = {}
+
+
+def getWorkerPool(workers):
+    """Process pool with `workers` processes, shared by all the calls."""
+    pool = _workerPools.get(workers)
+    if pool is None:
+        pool = _workerPools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+
+def shutdownWorkerPools():
+    """Stop the processes of the shared pools."""
+    while _workerPools:
+        _, pool = _workerPools.popitem()
+        pool.shutdown()
+
+
+def generateParallelHarmonization(
+    chords,
+    segmentStarts=(),
+    closePosition=False,
+    allowedUnisons=0,
+    engine="numpy",
+    executor=None,
+    workers=None,
+    cache=segmentCache,
+    firstVoicing=None,
+    lastVoicing=None,
+    beamWidth=None,
+    costThreshold=None,
+):
+    """Best voicing of each chord, voicing independent segments in parallel.
+
+    Each segment starting at an index of `segmentStarts` is voiced on its own,
+    without looking at the voicing that ends the previous segment. The
+    segments that are not cached are sent to `executor`, or to the shared
+    process pool with `workers` processes (see `getWorkerPool`).
+
+    `firstVoicing` fixes the first chord of the first segment, `lastVoicing`
+    the last chord of the last segment; `beamWidth` and `costThreshold` apply
+    to every segment (see `solveSegment`).
+    """
+    segments = splitSegments(len(chords), segmentStarts)
+    options = []
+    for i in range(len(segments)):
+        segmentOptions = (
+            tuple(firstVoicing) if i == 0 and firstVoicing else None,
+            tuple(lastVoicing) if i == len(segments) - 1 and lastVoicing else None,
+            beamWidth,
+            costThreshold,
+        )
+        # Segments voiced without options share their cache entries with the
+        # first segment of generateSegmentedHarmonization
+        options.append(
+            segmentOptions
+            if any(option is not None for option in segmentOptions)
+            else ()
+        )
+    keys = [
+        _segmentKey(
+            chords[start:end], None, closePosition, allowedUnisons, engine, options[i]
+        )
+        for i, (start, end) in enumerate(segments)
+    ]
+    results = [cache.get(key) if cache is not None else None for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    tasks = [
+        (
+            chords[segments[i][0] : segments[i][1]],
+            closePosition,
+            allowedUnisons,
+            engine,
+            options[i],
+        )
+        for i in missing
+    ]
+    if len(tasks) == 1:
+        solved = [_solveIndependentSegment(tasks[0])]
+    elif executor is not None:
+        solved = list(executor.map(_solveIndependentSegment, tasks))
+    elif len(tasks) > 1:
+        pool = getWorkerPool(workers)
+        try:
+            solved = list(pool.map(_solveIndependentSegment, tasks))
+        except BrokenProcessPool:
+            # A worker died: the next call starts a new pool
+            _workerPools.pop(workers, None)
+            raise
+    else:
+        solved = []
+    for i, voicings in zip(missing, solved):
+        results[i] = voicings
+        if cache is not None:
+            cache.put(keys[i], voicings)
+    return [v for voicings in results for v in voicings]
@@ -17,6 +17,8 @@ from music21.key import Key
 from music21.clef import BassClef, TrebleClef
 from music21.interval import Interval
 from .enums import PartEnum, Cost, Rule, IntervalV
+from .voicing_table import lookupVoicings
+from ..profiling import count
 
 _ruleCostMapping = {
     # progression rules
@@ -67,68 +69,50 @@ verticalHorizontalMapping = {
 
 perfectUnison = Interval("P1")
 
-cachedGetChordFromPitches = []
-cachedGetKeyFromString = []
-cachedGetPitchFromString = []
-cachedGetLeadingTone = []
-cachedGetVerticalIntervalsFromPitches = []
-cachedGetInterval = []
-cachedIsTriad = []
-cachedVoiceChord = []
-cachedProgressionCost = []
-cachedChordCost = []
 
-
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=8192)
 def getChordFromPitches(pitches):
     """Cached method. Calls music21.chord.Chord()."""
-    cachedGetChordFromPitches.append(pitches)
     return Chord(pitches)
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=256)
 def getKeyFromString(key):
     """Cached method. Calls music21.key.Key()."""
-    cachedGetKeyFromString.append(key)
     return Key(key)
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=1024)
 def getPitchFromString(p):
     """Cached method. Calls music21.pitch.Pitch()."""
-    cachedGetPitchFromString.append(p)
     return Pitch(p)
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=256)
 def getLeadingTone(key):
     """Cached method. Calls music21.key.Key.getLeadingTone()."""
-    cachedGetLeadingTone.append(key)
     return getKeyFromString(key).getLeadingTone()
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=8192)
 def getVerticalIntervalsFromPitches(pitches):
     """Cached method. Returns 6 vertical intervals: BT, BA, BS, TA, TS, AS."""
-    cachedGetVerticalIntervalsFromPitches.append(pitches)
     return [
         getInterval(pitches[i], pitches[j]) for i in range(3) for j in range(i + 1, 4)
     ]
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=16384)
 def getInterval(p1, p2):
     """Cached method. Calls music21.interval.Interval()."""
-    cachedGetInterval.append((p1, p2))
     pitch1 = getPitchFromString(p1)
     pitch2 = getPitchFromString(p2)
     return Interval(noteStart=pitch1, noteEnd=pitch2)
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=1024)
 def isTriad(pitches):
     """Cached method. Calls music21.chord.Chord.isTriad()."""
-    cachedIsTriad.append(pitches)
     return getChordFromPitches(pitches).isTriad()
 
 
@@ -242,14 +226,19 @@ def _voiceChord(pitches, closePosition=False, allowedUnisons=0):
                 )
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=1024)
 def voiceChord(pitches, closePosition=False, allowedUnisons=0):
-    """Cached method. Return the possible voicings for a tuple of pitches."""
-    cachedVoiceChord.append(pitches)
-    return [v for v in _voiceChord(pitches, closePosition, allowedUnisons)]
+    """Cached method. Return the possible voicings for a tuple of pitches.
+
+    Voicings are read from the precomputed voicing table when it has them.
+    """
+    voicings = lookupVoicings(pitches, closePosition, allowedUnisons)
+    if voicings is None:
+        voicings = [v for v in _voiceChord(pitches, closePosition, allowedUnisons)]
+    return voicings
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=65536)
 def progressionCost(key, pitches1, pitches2):
     """Computes the cost of two successive chords.
 
@@ -285,7 +274,6 @@ def progressionCost(key, pitches1, pitches2):
         which are necessary for passages with chromatic melodic lines.
         Augmented 4ths, diminished 5ths, and augmented 2nds are forbidden.
     """
-    cachedProgressionCost.append((key, pitches1, pitches2))
     chord1 = getChordFromPitches(pitches1)
     chord2 = getChordFromPitches(pitches2)
     horizontalIntervals = [getInterval(pitches1[i], pitches2[i]) for i in range(4)]
@@ -408,14 +396,13 @@ def progressionCost(key, pitches1, pitches2):
     return cost
 
 
-@lru_cache(maxsize=None)
+@lru_cache(maxsize=8192)
 def chordCost(pitches):
     """Computes the cost of an individual voicing, regardless of context.
 
     The cost of a single voicing can be evaluated, for example, to prefer
     specific doublings or to prefer spelling all the notes in a seventh chord
     (over, for example, omitting the third or fifth)."""
-    cachedChordCost.append(pitches)
     chord = getChordFromPitches(pitches)
     cost = 0
     if isTriad(frozenset(chord.pitchNames)):
@@ -430,8 +417,18 @@ def chordCost(pitches):
     return cost
 
 
+def getRomanNumerals(chords):
+    """music21 Roman numerals of a list of ChordItem."""
+    return [m21.roman.RomanNumeral(chord.chord, chord.key) for chord in chords]
+
+
 def solveProgressionChords(
-    chords, closePosition=False, firstVoicing=None, lastVoicing=None, allowedUnisons=0
+    chords,
+    closePosition=False,
+    firstVoicing=None,
+    lastVoicing=None,
+    allowedUnisons=0,
+    engine="numpy",
 ):
     """Voices a chord progression in a specified key using DP.
 
@@ -440,18 +437,59 @@ def solveProgressionChords(
     Returns a list of four-pitch chords, corresponding to successive Roman
     numerals in the chord progression.
     """
-    romanNumerals = [m21.roman.RomanNumeral(chord.chord, chord.key) for chord in chords]
+    romanNumerals = getRomanNumerals(chords)
     return solveProgression(
-        romanNumerals, closePosition, firstVoicing, lastVoicing, allowedUnisons
+        romanNumerals, closePosition, firstVoicing, lastVoicing, allowedUnisons, engine
     )
 
 
+def getCostFunctions(engine):
+    """Return the (chordCost, progressionCost) functions of a cost engine.
+
+    "integer" evaluates the rules on integer-encoded voicings, "music21" on
+    music21 intervals. Both give identical costs. The "numpy" engine of
+    `solveProgression` computes whole transition matrices and uses the
+    integer functions for single costs.
+    """
+    if engine in ("integer", "numpy"):
+        from . import integer_engine
+
+        return integer_engine.chordCost, integer_engine.progressionCost
+    elif engine == "music21":
+        return chordCost, progressionCost
+    raise ValueError(f"Unknown cost engine: {engine}")
+
+
+def getVoicingsPerChord(
+    romanNumerals,
+    closePosition=False,
+    firstVoicing=None,
+    lastVoicing=None,
+    allowedUnisons=0,
+):
+    """Candidate voicings of each Roman numeral of a progression."""
+    voicingsPerChord = []
+    for i, numeral in enumerate(romanNumerals):
+        pitches = tuple([p.nameWithOctave for p in numeral.pitches])
+
+        if i == 0 and firstVoicing:
+            voicings = [firstVoicing]
+        elif i == (len(romanNumerals) - 1) and lastVoicing:
+            voicings = [lastVoicing]
+        else:
+            voicings = voiceChord(pitches, closePosition, allowedUnisons)
+        count("voicings explored", len(voicings))
+        voicingsPerChord.append(voicings)
+    return voicingsPerChord
+
+
 def solveProgression(
     romanNumerals,
     closePosition=False,
     firstVoicing=None,
     lastVoicing=None,
     allowedUnisons=0,
+    engine="numpy",
 ):
     """Voices a chord progression in a specified key using DP.
 
@@ -461,16 +499,20 @@ def solveProgression(
     numerals in the chord progression.
     """
     keys = [rn.secondaryRomanNumeralKey or rn.key for rn in romanNumerals]
-    costTable = [{} for _ in romanNumerals]
-    for i, numeral in enumerate(romanNumerals):
-        pitches = tuple([p.nameWithOctave for p in numeral.pitches])
+    voicingsPerChord = getVoicingsPerChord(
+        romanNumerals, closePosition, firstVoicing, lastVoicing, allowedUnisons
+    )
 
-        if i == 0 and firstVoicing:
-            voicings = [firstVoicing]
-        elif i == (len(romanNumerals) - 1) and lastVoicing:
-            voicings = [lastVoicing]
-        else:
-            voicings = voiceChord(pitches, closePosition, allowedUnisons)
+    if engine == "numpy":
+        from .integer_engine import solveVoicings
+
+        return solveVoicings(
+            voicingsPerChord, [key.tonicPitchNameWithCase for key in keys]
+        )
+
+    chordCost, progressionCost = getCostFunctions(engine)
+    costTable = [{} for _ in romanNumerals]
+    for i, voicings in enumerate(voicingsPerChord):
         if i == 0:
             for v in voicings:
                 costTable[0][v] = (chordCost(v), None)
@@ -487,6 +529,41 @@ def solveProgression(
     return costTable
 
 
+def solveProgressionBeam(
+    romanNumerals,
+    closePosition=False,
+    firstVoicing=None,
+    lastVoicing=None,
+    allowedUnisons=0,
+    beamWidth=None,
+    costThreshold=None,
+    pruneForbidden=True,
+):
+    """Voices a chord progression keeping only the best states at each step.
+
+    Only the `beamWidth` cheapest voicings of each chord, and those within
+    `costThreshold` of the cheapest, are extended to the next chord.
+    Transitions costing `Cost.FORBIDDEN` or more are dropped whenever a
+    voicing can be reached otherwise. With no beam width, no threshold and
+    `pruneForbidden=False` the result is the one of `solveProgression`.
+
+    Returns (progression, cost), the best progression found and its cost.
+    """
+    from .integer_engine import solveVoicingsBeam
+
+    keys = [rn.secondaryRomanNumeralKey or rn.key for rn in romanNumerals]
+    voicingsPerChord = getVoicingsPerChord(
+        romanNumerals, closePosition, firstVoicing, lastVoicing, allowedUnisons
+    )
+    return solveVoicingsBeam(
+        voicingsPerChord,
+        [key.tonicPitchNameWithCase for key in keys],
+        beamWidth=beamWidth,
+        costThreshold=costThreshold,
+        pruneForbidden=pruneForbidden,
+    )
+
+
 def decorateScore(romantext, progression):
     """Decorate an annotated chorale into piano form.
 
@@ -536,3 +613,14 @@ def generateHarmonization(costTable):
         yield (list(reversed(progression)), totalCost)
         # progressions[topNthAnswer] = (list(reversed(progression)), totalCost)
     return
+
+
+def getBestHarmonization(costTable):
+    """Returns the first harmonization of `generateHarmonization` without
+    sorting the last layer of the cost table."""
+    cur, (totalCost, _) = min(costTable[-1].items(), key=lambda p: p[1][0])
+    progression = []
+    for i in reversed(range(len(costTable))):
+        progression.append(cur)
+        cur = costTable[i][cur][1]
+    return (list(reversed(progression)), totalCost)
@@ -0,0 +1,154 @@
+"""
+Precomputed voicings for common chord shapes.
+
+`voiceChord` enumerates voicings with a recursive generator built on music21
+pitches, which is slow and lost at the end of every process. The table built by
+`scripts/build_voicing_table.py` stores the result of that enumeration on disk:
+
+- `index.json`: table version, voice ranges, pitch name vocabulary and one
+  entry per (pitches, closePosition, allowedUnisons) with its row offsets.
+- `voicings.npy`: (N, 4) uint16 array of vocabulary indices, memory-mapped.
+
+The table is loaded lazily on the first lookup. Missing entries, a missing
+table or a table built with another version or other voice ranges make
+`lookupVoicings` return None, and the voicings are enumerated as before.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Bump when the enumeration in `voicing._voiceChord` changes
+TABLE_VERSION = 1
+
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(__file__), "data", "voicing_table")
+
+_INDEX_FILENAME = "index.json"
+_VOICINGS_FILENAME = "voicings.npy"
+
+
+def _entryKey(pitches, closePosition, allowedUnisons):
+    return f"{int(bool(closePosition))}|{allowedUnisons}|{' '.join(pitches)}"
+
+
+def _voiceRanges():
+    from .voicing import voice_ranges
+
+    return {
+        str(int(part)): [low.nameWithOctave, high.nameWithOctave]
+        for part, (low, high) in sorted(voice_ranges.items())
+    }
+
+
+class VoicingTable:
+    """Voicings of each entry, as rows of indices in a pitch name vocabulary."""
+
+    def __init__(
+        self,
+        vocabulary: List[str],
+        entries: Dict[str, Tuple[int, int]],
+        voicings: np.ndarray,
+    ):
+        self.vocabulary = vocabulary
+        self.entries = entries
+        self.voicings = voicings
+
+    @classmethod
+    def load(cls, path: str) -> Optional["VoicingTable"]:
+        """Load a table, or return None if it is missing or stale."""
+        try:
+            with open(os.path.join(path, _INDEX_FILENAME)) as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return None
+        if index.get("version") != TABLE_VERSION:
+            return None
+        if index.get("voice_ranges") != _voiceRanges():
+            return None
+        voicings = np.load(os.path.join(path, _VOICINGS_FILENAME), mmap_mode="r")
+        entries = {key: (start, end) for key, start, end in index["entries"]}
+        return cls(index["vocabulary"], entries, voicings)
+
+    def get(self, pitches, closePosition=False, allowedUnisons=0):
+        entry = self.entries.get(_entryKey(pitches, closePosition, allowedUnisons))
+        if entry is None:
+            return None
+        start, end = entry
+        vocabulary = self.vocabulary
+        return [
+            tuple(vocabulary[i] for i in row)
+            for row in self.voicings[start:end].tolist()
+        ]
+
+
+def buildVoicingTable(
+    path: str,
+    pitchesList: Iterable[Tuple[str, ...]],
+    settings: Iterable[Tuple[bool, int]] = ((False, 0),),
+) -> int:
+    """Enumerate the voicings of every pitches tuple and write the table to `path`.
+
+    Returns the number of entries written.
+    """
+    from .voicing import _voiceChord
+
+    vocabulary = []
+    vocabularyIndex = {}
+    entries = []
+    rows = []
+    for closePosition, allowedUnisons in settings:
+        for pitches in dict.fromkeys(pitchesList):
+            key = _entryKey(pitches, closePosition, allowedUnisons)
+            start = len(rows)
+            for v in _voiceChord(pitches, closePosition, allowedUnisons):
+                row = []
+                for p in v:
+                    if p not in vocabularyIndex:
+                        vocabularyIndex[p] = len(vocabulary)
+                        vocabulary.append(p)
+                    row.append(vocabularyIndex[p])
+                rows.append(row)
+            entries.append([key, start, len(rows)])
+
+    os.makedirs(path, exist_ok=True)
+    np.save(
+        os.path.join(path, _VOICINGS_FILENAME),
+        np.array(rows, dtype=np.uint16).reshape(-1, 4),
+    )
+    with open(os.path.join(path, _INDEX_FILENAME), "w") as f:
+        json.dump(
+            {
+                "version": TABLE_VERSION,
+                "voice_ranges": _voiceRanges(),
+                "vocabulary": vocabulary,
+                "entries": entries,
+            },
+            f,
+        )
+    return len(entries)
+
+
+_table = None
+_tableLoaded = False
+
+
+def lookupVoicings(pitches, closePosition=False, allowedUnisons=0):
+    """Voicings of `pitches` from the table at `HARMONICS_VOICING_TABLE`
+    (default: the table shipped with the package), or None."""
+    global _table, _tableLoaded
+    if not _tableLoaded:
+        path = os.environ.get("HARMONICS_VOICING_TABLE", DEFAULT_TABLE_PATH)
+        _table = VoicingTable.load(path)
+        _tableLoaded = True
+    if _table is None:
+        return None
+    return _table.get(pitches, closePosition, allowedUnisons)
+
+
+def resetVoicingTable():
+    """Forget the loaded table, so the next lookup loads it again."""
+    global _table, _tableLoaded
+    _table = None
+    _tableLoaded = False
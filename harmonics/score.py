@@ -1,12 +1,20 @@
-from functools import lru_cache
-from typing import List, Optional, Union, Tuple, Any, Dict, Set
+import os
+from array import array
+from collections.abc import Mapping
+from fractions import Fraction
+from itertools import accumulate
+from typing import List, Optional, Tuple, Any, Dict, Set
+
+from pydantic import PrivateAttr
 
 from .models import BaseModel
-from .notes_utils import getPitchFromIntervalFromMinimallyModifiedScale
 import harmonics.models as models
 import harmonics.exceptions as exceptions
 import harmonics.commons.utils_techniques as utils_techniques
 from harmonics.commons.utils_beat import to_beat_fraction
+from harmonics.chord_timeline import ChordTimeline
+from harmonics.profiling import count, span
+from harmonics.timebase import Timebase
 
 from harmonics.score_models import (
     NoteItem,
@@ -53,69 +61,165 @@ def get_current_chord_index_from_time(
     return None
 
 
-def get_measure_map(lines: List[models.Line]) -> Dict[int, models.Line]:
-    measure_map = {}
-    tss = []
+def get_segment_starts(chords: List[ChordItem], phrase_ends: Set[int]) -> List[int]:
+    """Indices of the chords starting a new key area or a new phrase."""
+    starts = []
+    for i in range(1, len(chords)):
+        previous, chord = chords[i - 1], chords[i]
+        if chord.new_key and chord.key != previous.key:
+            starts.append(i)
+        elif (
+            previous.measure_number in phrase_ends
+            and chord.measure_number > previous.measure_number
+        ):
+            starts.append(i)
+    return starts
 
-    # First pass collect max measure number
-    max_measure = 0
-    for line in lines:
-        if isinstance(line, (models.Melody, models.Events)):
-            max_measure = max(max_measure, line.measure_number)
 
-    # First pass: collect all time signatures
-    previous_measure_number = 0
-    already_declared_measures = set()
+class MeasureTimeline(Mapping):
+    """Start/end time (in quarters) and time signature of measures 1..N.
 
-    # Are measures sorted
-    measure_numbers = [
-        l.measure_number for l in lines if isinstance(l, (models.Melody, models.Events))
-    ]
-    are_measures_sorted = measure_numbers == sorted(measure_numbers)
+    Values are stored in flat arrays indexed by measure number - 1, and the
+    timeline can be used as a read-only `measure_number -> (start, end, ts)` mapping.
+    """
 
-    for line in lines:
-        if isinstance(line, (models.Melody, models.Events)):
-            previous_measure_number = line.measure_number
-        elif isinstance(line, models.TimeSignature):
-            if line.measure_number is None:
-                if not are_measures_sorted and previous_measure_number > 0:
-                    raise exceptions.TimeSignatureMeasureMustBeDeclared(
-                        f"Time signature measure number must be declared when measures are not sorted"
+    def __init__(
+        self,
+        starts: array,
+        ends: array,
+        numerators: array,
+        denominators: array,
+    ):
+        self.starts = starts
+        self.ends = ends
+        self.numerators = numerators
+        self.denominators = denominators
+
+    @classmethod
+    def from_lines(cls, lines: List[models.Line]) -> "MeasureTimeline":
+        measure_numbers = [
+            l.measure_number
+            for l in lines
+            if isinstance(l, (models.Melody, models.Events))
+        ]
+        max_measure = max(measure_numbers, default=0)
+        are_measures_sorted = all(
+            a <= b for a, b in zip(measure_numbers, measure_numbers[1:])
+        )
+
+        # Collect the time signature declared for each measure
+        time_signatures = {}
+        previous_measure_number = 0
+        for line in lines:
+            if isinstance(line, (models.Melody, models.Events)):
+                previous_measure_number = line.measure_number
+            elif isinstance(line, models.TimeSignature):
+                measure_number = line.measure_number
+                if measure_number is None:
+                    if not are_measures_sorted and previous_measure_number > 0:
+                        raise exceptions.TimeSignatureMeasureMustBeDeclared(
+                            f"Time signature measure number must be declared when measures are not sorted"
+                        )
+                    # Time signature valid for next measure
+                    measure_number = previous_measure_number + 1
+                if measure_number in time_signatures:
+                    raise exceptions.TimeSignatureAlreadyDeclared(
+                        f"Time signature for measure {measure_number} already declared"
                     )
-                line.measure_number = (
-                    previous_measure_number + 1
-                )  # Time signature valid for next measure
-            if line.measure_number in already_declared_measures:
-                raise exceptions.TimeSignatureAlreadyDeclared(
-                    f"Time signature for measure {line.measure_number} already declared"
+                time_signatures[measure_number] = (line.numerator, line.denominator)
+
+        # Calculate measure start time for each measure from 1 to max_measure
+        starts, ends = array("d"), array("d")
+        numerators, denominators = array("i"), array("i")
+        current_time_in_quarters = 0
+        current_ts = None
+        for i in range(1, max_measure + 1):
+            current_ts = time_signatures.get(i, current_ts)
+            if current_ts is None:
+                raise exceptions.TimeSignatureNotDeclared(
+                    f"No time signature found for measure {i}"
                 )
-            tss.append(line)
-            already_declared_measures.add(line.measure_number)
-
-    # Calculate measure start time for each measure from 1 to max_measure
-    current_time_in_quarters = 0
-    current_ts = None
-    for i in range(1, max_measure + 1):
-        for ts in tss:
-            if ts.measure_number == i:
-                current_ts = ts
-        if current_ts is None:
-            raise exceptions.TimeSignatureNotDeclared(
-                f"No time signature found for measure {i}"
-            )
-        start_time = current_time_in_quarters
-        bar_duration = bar_duration_in_quarters(
-            (current_ts.numerator, current_ts.denominator)
+            starts.append(current_time_in_quarters)
+            current_time_in_quarters += bar_duration_in_quarters(current_ts)
+            ends.append(current_time_in_quarters)
+            numerators.append(current_ts[0])
+            denominators.append(current_ts[1])
+
+        return cls(starts, ends, numerators, denominators)
+
+    @property
+    def last_measure(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, measure_number: int) -> Tuple[float, float, Tuple[int, int]]:
+        i = measure_number - 1
+        if not 0 <= i < len(self.starts):
+            raise KeyError(measure_number)
+        return (
+            self.starts[i],
+            self.ends[i],
+            (self.numerators[i], self.denominators[i]),
         )
-        current_time_in_quarters += bar_duration
-        end_time = current_time_in_quarters
-        measure_map[i] = (
-            start_time,
-            end_time,
-            (current_ts.numerator, current_ts.denominator),
+
+    def __iter__(self):
+        return iter(range(1, len(self.starts) + 1))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+def set_ticks(
+    notes: List[NoteItem], timeline: MeasureTimeline, items: List[Any]
+) -> Timebase:
+    """Set the `tick` of the notes and timed `items` in the timebase of the notes.
+
+    Note onsets and durations are exact in the timebase. The times of the other
+    items are rounded to the nearest tick.
+    """
+    # Onset (from the start of the bar) and duration of the notes, in quarters,
+    # computed once for each distinct beat, duration and time signature
+    note_keys = []
+    quarters = {}
+    for note in notes:
+        beat, duration = note.beat, note.duration
+        denominator = note.time_signature[1]
+        key = (
+            beat.numerator,
+            beat.denominator,
+            duration.numerator,
+            duration.denominator,
+            denominator,
         )
+        if key not in quarters:
+            ratio = Fraction(4, denominator)
+            quarters[key] = ((beat - 1) * ratio, duration * ratio)
+        note_keys.append(key)
+    bar_durations = [
+        Fraction(4 * numerator, denominator)
+        for numerator, denominator in zip(timeline.numerators, timeline.denominators)
+    ]
+    timebase = Timebase.from_quarters(
+        [*set(bar_durations), *(q for pair in quarters.values() for q in pair)]
+    )
+
+    bar_starts = list(accumulate(map(timebase.ticks, bar_durations), initial=0))
+    ticks = {
+        key: (timebase.ticks(onset), timebase.ticks(duration))
+        for key, (onset, duration) in quarters.items()
+    }
+    for note, key in zip(notes, note_keys):
+        onset, duration = ticks[key]
+        note.tick = bar_starts[note.measure_number - 1] + onset
+        note.duration_ticks = duration
+    for item in items:
+        item.tick = timebase.ticks(item.time)
+    return timebase
+
 
-    return measure_map
+def get_measure_map(
+    lines: List[models.Line],
+) -> Dict[int, Tuple[float, float, Tuple[int, int]]]:
+    return dict(MeasureTimeline.from_lines(lines))
 
 
 class ScoreData(BaseModel):
@@ -130,8 +234,48 @@ class ScoreData(BaseModel):
     measure_boundaries: Dict[int, str]  # Measure number -> measure boundary
 
 
-@lru_cache(maxsize=10)
-def get_data(self) -> ScoreData:
+class CompiledScore(BaseModel):
+    """All the views derived from a ScoreDocument, computed in a single pass."""
+
+    data: ScoreData
+    notes: List[NoteItem]
+    events: List[EventItem]
+    techniques: List[TechniqueItem]
+    clefs: List[ClefItem]
+    ticks_per_quarter: Optional[int] = None
+
+    _chord_timeline: Optional[ChordTimeline] = PrivateAttr(default=None)
+    _note_table: Any = PrivateAttr(default=None)
+
+    @property
+    def chords(self) -> List[ChordItem]:
+        return self.data.chords
+
+    @property
+    def note_table(self):
+        """The notes as a `NoteTable` (see `harmonics.note_table`)."""
+        if self._note_table is None:
+            from harmonics.note_table import NoteTable
+
+            self._note_table = NoteTable(self.notes)
+        return self._note_table
+
+    @property
+    def chord_timeline(self) -> ChordTimeline:
+        if self._chord_timeline is None:
+            self._chord_timeline = ChordTimeline(self.chords)
+        return self._chord_timeline
+
+
+def get_worker_count() -> int:
+    """Number of processes set by HARMONICS_WORKERS, 1 if unset or malformed."""
+    try:
+        return max(1, int(os.environ.get("HARMONICS_WORKERS", "1")))
+    except ValueError:
+        return 1
+
+
+def get_data(self, segmented: bool = False) -> ScoreData:
     chords = []
     bar_start_time = 0  # In quarter (not in beat !)
     current_bar_index = 1  # Start at bar 1
@@ -145,6 +289,7 @@ def get_data(self) -> ScoreData:
     all_tracks = []
     key_signatures = []
     measure_boundaries = {}  # Measure number -> measure boundary
+    phrase_ends = set()  # Measure numbers ending with a phrase boundary
     title = ""
     composer = ""
     groups = {}
@@ -173,12 +318,13 @@ def get_data(self) -> ScoreData:
                 duration = 0
                 if beat_item.key is not None:
                     current_key = beat_item.key
+                # Built without validation: the values are already typed
                 chords.append(
-                    ChordItem(
-                        time=beat_start_time + bar_start_time,
+                    ChordItem.trusted(
+                        time=float(beat_start_time + bar_start_time),
                         measure_number=line.measure_number,
-                        beat=to_beat_fraction(beat_item.beat),
-                        duration=duration,
+                        beat=float(to_beat_fraction(beat_item.beat)),
+                        duration=float(duration),
                         chord=beat_item.chord,
                         time_signature=current_time_signature,
                         key=current_key,
@@ -187,6 +333,8 @@ def get_data(self) -> ScoreData:
                     )
                 )
             current_time_signature = next_current_time_signature
+            if line.phrase_boundary is not None:
+                phrase_ends.add(line.measure_number)
         elif isinstance(line, models.Title):
             title = line.title
         elif isinstance(line, models.Composer):
@@ -269,7 +417,11 @@ def get_data(self) -> ScoreData:
             +bar_duration_in_beats(current_time_signature) + 1 - chords[-1].beat
         )
 
-    self.get_progression(chords)
+    count("chords", len(chords))
+    with span("harmonisation"):
+        self.get_progression(
+            chords, phrase_ends | set(measure_boundaries), segmented=segmented
+        )
     instrument_tracks = [i.track_name for i in instruments]
     missing_tracks = set(all_tracks) - set(instrument_tracks)
     for track_name in missing_tracks:
@@ -297,20 +449,130 @@ def get_data(self) -> ScoreData:
 class ScoreDocument(BaseModel):
     lines: List[models.Line]
 
+    # Compiled views, cached on the document itself and dropped when `lines` changes
+    _compiled: Optional[CompiledScore] = PrivateAttr(default=None)
+    _compiled_segmented: bool = PrivateAttr(default=False)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "lines":
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drop the compiled views. Call it after mutating `lines` in place."""
+        self._compiled = None
+
+    def compile(self, segmented: bool = False) -> CompiledScore:
+        """Compile the document into all its derived views (chords, notes, events, techniques, clefs).
+
+        With `segmented=True`, the chords are voiced segment by segment instead
+        of by a single DP over the whole progression (see `get_progression`).
+        The result is cached on the document until `lines` is reassigned or `invalidate` is called.
+        """
+        if self._compiled is None or self._compiled_segmented != segmented:
+            with span("compile"):
+                self._compiled = self._compile(segmented)
+            self._compiled_segmented = segmented
+        return self._compiled
+
+    def _compile(self, segmented: bool = False) -> CompiledScore:
+        data = get_data(self, segmented)
+        with span("measure map"):
+            timeline = MeasureTimeline.from_lines(self.lines)
+            chord_timeline = ChordTimeline(data.chords)
+
+        notes = []
+        events = self._get_first_tempo_event(data.tempos)
+        techniques = []
+        clefs = []
+        clef_changes = []
+        with span("note extraction"):
+            for line in self.lines:
+                if isinstance(line, models.Melody):
+                    notes.extend(
+                        self._get_melody_notes(line, timeline, chord_timeline)
+                    )
+                elif isinstance(line, models.Events):
+                    events.extend(self._get_line_events(line, timeline))
+                elif isinstance(line, models.Technique):
+                    techniques.extend(self._get_line_techniques(line, timeline))
+                elif isinstance(line, models.Clef):
+                    clefs.append(self._get_clef(line, timeline))
+                elif isinstance(line, models.ClefChange):
+                    clef_changes.append(self._get_clef_change(line, timeline))
+            notes.sort(key=lambda r: (r.measure_number, r.beat))
+        count("notes", len(notes))
+        # Clefs declared as metadata first, then clef changes, sorted by time
+        clefs.extend(clef_changes)
+        clefs.sort(key=lambda c: (c.time, c.measure_number, c.beat))
+
+        with span("timebase"):
+            timebase = set_ticks(
+                notes,
+                timeline,
+                [*data.chords, *data.tempos, *data.time_signatures, *events],
+            )
+
+        compiled = CompiledScore(
+            data=data,
+            notes=notes,
+            events=events,
+            techniques=techniques,
+            clefs=clefs,
+            ticks_per_quarter=timebase.ticks_per_quarter,
+        )
+        compiled._chord_timeline = chord_timeline
+        return compiled
+
     @property
     def time_signatures(self) -> List[TimeSignatureItem]:
         pass
 
-    def get_progression(self, chords: List[ChordItem]) -> List[str]:
+    def get_progression(
+        self,
+        chords: List[ChordItem],
+        phrase_ends: Set[int] = frozenset(),
+        segmented: bool = False,
+    ) -> List[str]:
+        """Voice the chords with a single DP over the whole progression.
+
+        With `segmented=True`, the chords are voiced one segment per key area
+        and phrase. Segments are cached across documents, so that re-compiling
+        an edited document only re-voices the edited segments (and the
+        segments that follow them, if the voicing at their boundary changed),
+        but a segment is voiced without looking past its end.
+
+        When segmented and the HARMONICS_WORKERS environment variable is above
+        1, segments are voiced independently of each other over that many
+        processes.
+        """
         from music21.pitch import Pitch
-        from harmonics.romanyh import generateBestHarmonization
+        from harmonics.romanyh import (
+            generateBestHarmonization,
+            generateSegmentedHarmonization,
+        )
 
-        if len(chords) > 0:
+        workers = get_worker_count()
+        segment_starts = get_segment_starts(chords, phrase_ends)
+        if len(chords) > 0 and not segmented:
+            progression = generateBestHarmonization(
+                chords,
+                closePosition=False,
+                allowedUnisons=0,
+            )
+        elif len(chords) > 0 and workers > 1 and len(segment_starts) > 0:
             progression = generateBestHarmonization(
                 chords,
                 closePosition=False,
-                firstVoicing=None,
-                lastVoicing=None,
+                allowedUnisons=0,
+                segmentStarts=segment_starts,
+                workers=workers,
+            )
+        elif len(chords) > 0:
+            progression = generateSegmentedHarmonization(
+                chords,
+                segment_starts,
+                closePosition=False,
                 allowedUnisons=0,
             )
         else:
@@ -322,149 +584,164 @@ class ScoreDocument(BaseModel):
 
     @property
     def data(self) -> ScoreData:
-        return get_data(self)
+        return self.compile().data
 
     @property
     def chords(self) -> List[ChordItem]:
-        return self.data.chords
+        return self.compile().chords
 
     @property
     def notes(self) -> List[NoteItem]:
-        import time as tt
+        return self.compile().notes
 
-        results = []
-        chords = self.chords
-        current_chord = None
-        previous_current_chord = None
-        measure_map = get_measure_map(self.lines)
-        for line in self.lines:
-            if isinstance(line, models.Melody):
-                bar_start_time, bar_end_time, current_time_signature = measure_map[
-                    line.measure_number
-                ]
-                bar_notes = []
-                for note in line.notes:
-                    beat_start_time = beat_to_quarter(note.beat, current_time_signature)
-                    duration = 0
-                    time = beat_start_time + bar_start_time
-                    current_chord = get_current_chord_from_time(time, chords)
-                    voices = None
-                    is_silence = False
-                    is_continuation = False
-
-                    if isinstance(note, models.Silence):
-                        pitch = None
-                        is_silence = True
-                    elif isinstance(note, models.Continuation):
-                        pitch = None
-                        is_continuation = True
-                    elif isinstance(note, models.AbsoluteMelodyNote):
-                        pitch = note.note
-                    elif isinstance(note, models.ChordMelodyNote):
-                        pitch = [n.note for n in note.notes]
-                    elif isinstance(note, models.AccompanimentBeat):
-                        voices = note.voices
-                        pitch = [current_chord.pitches[v.voice - 1] for v in voices]
-
-                    if current_chord is None:
-                        current_chord = ChordItem(
-                            time=beat_start_time + bar_start_time,
-                            duration=duration,
-                            chord="NC",
-                            time_signature=current_time_signature,
-                            key=None,
-                            beat=note.beat,
-                            measure_number=line.measure_number,
-                        )
-                    # global_techniques = self.get_techniques_for_note(
-                    #     time, line.track_name, self.techniques
-                    # )
-                    global_techniques = []
-                    bar_notes.append(
-                        NoteItem(
-                            time=beat_start_time + bar_start_time,
-                            duration=duration,
-                            chord=current_chord.chord,
-                            key=current_chord.key,
-                            time_signature=current_time_signature,
-                            pitch=pitch,
-                            voices=voices,
-                            is_silence=is_silence,
-                            is_continuation=is_continuation,
-                            voice_name=line.voice_name,
-                            track_name=line.track_name,
-                            techniques=note.techniques,
-                            global_techniques=global_techniques,
-                            measure_number=line.measure_number,
-                            beat=note.beat,
-                            is_exact=note.is_exact,
-                            text_comment=note.text_comment,
-                        )
-                    )
-                if len(bar_notes) > 0:
-                    for i in range(len(bar_notes) - 1):
-                        if bar_notes[i].is_exact and bar_notes[i + 1].is_exact:
-                            bar_notes[i].duration = (
-                                bar_notes[i + 1].beat - bar_notes[i].beat
-                            )
-                        else:
-                            bar_notes[i].duration = to_beat_fraction(
-                                bar_notes[i + 1].beat - bar_notes[i].beat
-                            )
-                    if bar_notes[-1].is_exact:
-                        bar_notes[-1].duration = (
-                            bar_duration_in_beats(current_time_signature)
-                            - bar_notes[-1].beat
-                            + 1
-                        )
-                    else:
-                        bar_notes[-1].duration = to_beat_fraction(
-                            bar_duration_in_beats(current_time_signature)
-                            - bar_notes[-1].beat
-                            + 1
-                        )
-                    results.extend(bar_notes)
-        results = sorted(results, key=lambda r: (r.measure_number, r.beat))
-        return results
+    @property
+    def note_table(self):
+        return self.compile().note_table
 
     @property
     def events(self) -> List[EventItem]:
-        results = []
-        bar_start_time = 0  # In quarter (not in beat !)
-        measure_map = get_measure_map(self.lines)
+        return self.compile().events
+
+    @property
+    def techniques(self) -> List[TechniqueItem]:
+        return self.compile().techniques
+
+    @property
+    def clefs(self) -> List[ClefItem]:
+        return self.compile().clefs
+
+    @property
+    def chord_timeline(self) -> ChordTimeline:
+        return self.compile().chord_timeline
+
+    def _get_melody_notes(
+        self,
+        line: models.Melody,
+        timeline: MeasureTimeline,
+        chord_timeline: ChordTimeline,
+    ) -> List[NoteItem]:
+        bar_start_time, bar_end_time, current_time_signature = timeline[
+            line.measure_number
+        ]
+        times = [
+            bar_start_time + beat_to_quarter(note.beat, current_time_signature)
+            for note in line.notes
+        ]
+        bar_notes = []
+        for note, time, current_chord in zip(
+            line.notes, times, chord_timeline.iter_at(times)
+        ):
+            duration = 0
+            voices = None
+            is_silence = False
+            is_continuation = False
+
+            if isinstance(note, models.Silence):
+                pitch = None
+                is_silence = True
+            elif isinstance(note, models.Continuation):
+                pitch = None
+                is_continuation = True
+            elif isinstance(note, models.AbsoluteMelodyNote):
+                pitch = note.note
+            elif isinstance(note, models.ChordMelodyNote):
+                pitch = [n.note for n in note.notes]
+            elif isinstance(note, models.AccompanimentBeat):
+                voices = note.voices
+                pitch = [current_chord.pitches[v.voice - 1] for v in voices]
+
+            if current_chord is None:
+                current_chord = ChordItem(
+                    time=time,
+                    duration=duration,
+                    chord="NC",
+                    time_signature=current_time_signature,
+                    key=None,
+                    beat=note.beat,
+                    measure_number=line.measure_number,
+                )
+            # global_techniques = self.get_techniques_for_note(
+            #     time, line.track_name, self.techniques
+            # )
+            global_techniques = []
+            # Built without validation: the values come from the parsed models
+            bar_notes.append(
+                NoteItem.trusted(
+                    time=float(time),
+                    duration=duration,
+                    chord=current_chord.chord,
+                    key=current_chord.key,
+                    time_signature=current_time_signature,
+                    pitch=pitch,
+                    is_silence=is_silence,
+                    is_continuation=is_continuation,
+                    voice_name=line.voice_name,
+                    track_name=line.track_name,
+                    techniques=list(note.techniques),
+                    global_techniques=global_techniques,
+                    measure_number=line.measure_number,
+                    beat=note.beat,
+                    is_exact=note.is_exact,
+                    text_comment=note.text_comment,
+                )
+            )
+        if len(bar_notes) > 0:
+            for i in range(len(bar_notes) - 1):
+                if bar_notes[i].is_exact and bar_notes[i + 1].is_exact:
+                    bar_notes[i].duration = bar_notes[i + 1].beat - bar_notes[i].beat
+                else:
+                    bar_notes[i].duration = to_beat_fraction(
+                        bar_notes[i + 1].beat - bar_notes[i].beat
+                    )
+            if bar_notes[-1].is_exact:
+                bar_notes[-1].duration = (
+                    bar_duration_in_beats(current_time_signature)
+                    - bar_notes[-1].beat
+                    + 1
+                )
+            else:
+                bar_notes[-1].duration = to_beat_fraction(
+                    bar_duration_in_beats(current_time_signature)
+                    - bar_notes[-1].beat
+                    + 1
+                )
+        return bar_notes
+
+    def _get_first_tempo_event(self, tempos: List[TempoItem]) -> List[EventItem]:
         # Add first tempo to events
-        first_tempo = self.data.tempos[0] if len(self.data.tempos) > 0 else None
-        if first_tempo is not None:
+        first_tempo = tempos[0] if len(tempos) > 0 else None
+        if first_tempo is None:
+            return []
+        return [
+            EventItem.trusted(
+                time=first_tempo.time,
+                measure_number=first_tempo.measure_number,
+                beat=1.0,
+                event_type="tempo",
+                event_value=first_tempo.tempo,
+            )
+        ]
+
+    def _get_line_events(
+        self, line: models.Events, timeline: MeasureTimeline
+    ) -> List[EventItem]:
+        results = []
+        bar_start_time, bar_end_time, current_time_signature = timeline[
+            line.measure_number
+        ]
+        for event in line.events:
+            # We use the next time signature because the event is in the next bar
+            beat_start_time = beat_to_quarter(event.beat, current_time_signature)
+            time = beat_start_time + bar_start_time
             results.append(
-                EventItem(
-                    time=first_tempo.time,
-                    measure_number=first_tempo.measure_number,
-                    beat=1.0,
-                    event_type="tempo",
-                    event_value=first_tempo.tempo,
+                EventItem.trusted(
+                    time=float(time),
+                    measure_number=event.measure_number,
+                    beat=float(to_beat_fraction(event.beat)),
+                    event_type=event.event_type,
+                    event_value=event.event_value,
                 )
             )
-
-        for line in self.lines:
-            if isinstance(line, models.Events):
-                bar_start_time, bar_end_time, current_time_signature = measure_map[
-                    line.measure_number
-                ]
-                for event in line.events:
-                    # We use the next time signature because the event is in the next bar
-                    beat_start_time = beat_to_quarter(
-                        event.beat, current_time_signature
-                    )
-                    time = beat_start_time + bar_start_time
-                    results.append(
-                        EventItem(
-                            time=time,
-                            measure_number=event.measure_number,
-                            beat=to_beat_fraction(event.beat),
-                            event_type=event.event_type,
-                            event_value=event.event_value,
-                        )
-                    )
         return results
 
     def get_bar_info(
@@ -472,48 +749,47 @@ class ScoreDocument(BaseModel):
         measure_number: int,
         measure_map: Dict[int, Tuple[float, float, Tuple[int, int]]],
     ) -> Tuple[float, float, Tuple[int, int]]:
+        last_measure = len(measure_map)
         start_bar_time, end_bar_time, time_signature = measure_map[
-            min(measure_number, max(measure_map.keys()))
+            min(measure_number, last_measure)
         ]
-        delta_bar = measure_number - max(measure_map.keys())
+        delta_bar = measure_number - last_measure
         if delta_bar > 0:
             start_bar_time += delta_bar * bar_duration_in_quarters(time_signature)
             end_bar_time += delta_bar * bar_duration_in_quarters(time_signature)
         return start_bar_time, end_bar_time, time_signature
 
-    @property
-    def techniques(self) -> List[TechniqueItem]:
+    def _get_line_techniques(
+        self, line: models.Technique, timeline: MeasureTimeline
+    ) -> List[TechniqueItem]:
         results = []
-        measure_map = get_measure_map(self.lines)
-        for i, line in enumerate(self.lines):
-            if isinstance(line, models.Technique):
-                start_start_bar_time, _, start_time_signature = self.get_bar_info(
-                    line.technique_range.start_measure, measure_map
-                )
-                end_end_bar_time, _, end_time_signature = self.get_bar_info(
-                    line.technique_range.end_measure, measure_map
-                )
+        start_start_bar_time, _, start_time_signature = self.get_bar_info(
+            line.technique_range.start_measure, timeline
+        )
+        end_end_bar_time, _, end_time_signature = self.get_bar_info(
+            line.technique_range.end_measure, timeline
+        )
 
-                start_time = start_start_bar_time + beat_to_quarter(
-                    line.technique_range.start_beat, start_time_signature
-                )
-                end_time = end_end_bar_time + beat_to_quarter(
-                    line.technique_range.end_beat, end_time_signature
+        start_time = start_start_bar_time + beat_to_quarter(
+            line.technique_range.start_beat, start_time_signature
+        )
+        end_time = end_end_bar_time + beat_to_quarter(
+            line.technique_range.end_beat, end_time_signature
+        )
+        for track_name in line.track_names:
+            for technique in line.techniques:
+                results.append(
+                    TechniqueItem(
+                        time_start=start_time,
+                        time_end=end_time,
+                        measure_number_start=line.technique_range.start_measure,
+                        beat_start=line.technique_range.start_beat,
+                        measure_number_end=line.technique_range.end_measure,
+                        beat_end=line.technique_range.end_beat,
+                        track_name=track_name,
+                        technique=technique,
+                    )
                 )
-                for track_name in line.track_names:
-                    for technique in line.techniques:
-                        results.append(
-                            TechniqueItem(
-                                time_start=start_time,
-                                time_end=end_time,
-                                measure_number_start=line.technique_range.start_measure,
-                                beat_start=line.technique_range.start_beat,
-                                measure_number_end=line.technique_range.end_measure,
-                                beat_end=line.technique_range.end_beat,
-                                track_name=track_name,
-                                technique=technique,
-                            )
-                        )
         return results
 
     @property
@@ -534,51 +810,35 @@ class ScoreDocument(BaseModel):
                 active_techniques.append(technique.technique)
         return active_techniques
 
-    @property
-    def clefs(self) -> List[ClefItem]:
-        results = []
-        measure_map = get_measure_map(self.lines)
-
-        # First add any clefs declared as metadata
-        for line in self.lines:
-            if isinstance(line, models.Clef):
-                measure_number = (
-                    line.measure_number if line.measure_number is not None else 1
-                )
-                bar_start_time, _, current_time_signature = measure_map.get(
-                    measure_number, (0, 0, (4, 4))
-                )
-                results.append(
-                    ClefItem(
-                        time=bar_start_time,
-                        track_name=line.track_name,
-                        clef_name=line.clef_type.name,
-                        octave_change=line.clef_type.octave_change,
-                        measure_number=measure_number,
-                        beat=1.0,  # Default to first beat
-                    )
-                )
-
-        # Then add clef changes within the score
-        for line in self.lines:
-            if isinstance(line, models.ClefChange):
-                bar_start_time, _, current_time_signature = measure_map.get(
-                    line.measure_number, (0, 0, (4, 4))
-                )
-                beat_start_time = beat_to_quarter(line.beat, current_time_signature)
-                time = beat_start_time + bar_start_time
-
-                results.append(
-                    ClefItem(
-                        time=time,
-                        track_name=line.track_name,
-                        clef_name=line.clef_type.name,
-                        octave_change=line.clef_type.octave_change,
-                        measure_number=line.measure_number,
-                        beat=to_beat_fraction(line.beat),
-                    )
-                )
+    def _get_clef(self, line: models.Clef, timeline: MeasureTimeline) -> ClefItem:
+        # Clef declared as metadata
+        measure_number = line.measure_number if line.measure_number is not None else 1
+        bar_start_time, _, current_time_signature = timeline.get(
+            measure_number, (0, 0, (4, 4))
+        )
+        return ClefItem(
+            time=bar_start_time,
+            track_name=line.track_name,
+            clef_name=line.clef_type.name,
+            octave_change=line.clef_type.octave_change,
+            measure_number=measure_number,
+            beat=1.0,  # Default to first beat
+        )
 
-        # Sort clefs by time for proper processing
-        results.sort(key=lambda c: (c.time, c.measure_number, c.beat))
-        return results
+    def _get_clef_change(
+        self, line: models.ClefChange, timeline: MeasureTimeline
+    ) -> ClefItem:
+        # Clef change within the score
+        bar_start_time, _, current_time_signature = timeline.get(
+            line.measure_number, (0, 0, (4, 4))
+        )
+        beat_start_time = beat_to_quarter(line.beat, current_time_signature)
+        time = beat_start_time + bar_start_time
+        return ClefItem(
+            time=time,
+            track_name=line.track_name,
+            clef_name=line.clef_type.name,
+            octave_change=line.clef_type.octave_change,
+            measure_number=line.measure_number,
+            beat=to_beat_fraction(line.beat),
+        )
@@ -1,10 +1,12 @@
 from typing import List, Optional, Union, Tuple, Any, Dict, Set
+from pydantic import PrivateAttr
 from .models import BaseModel
 from fractions import Fraction
 
 
 class ChordItem(BaseModel):
     time: float
+    tick: Optional[int] = None  # Time in ticks of the score timebase
     beat: float
     measure_number: int
     duration: float
@@ -18,7 +20,9 @@ class ChordItem(BaseModel):
 
 class NoteItem(BaseModel):
     time: Optional[float] = 0
+    tick: Optional[int] = None  # Time in ticks of the score timebase
     duration: Fraction
+    duration_ticks: Optional[int] = None  # Duration (in quarters) in ticks
     chord: Optional[str] = None
     key: Optional[str] = None
     time_signature: Optional[Tuple[int, int]] = None
@@ -37,6 +41,7 @@ class NoteItem(BaseModel):
 
 class TempoItem(BaseModel):
     time: float
+    tick: Optional[int] = None
     tempo: int
     figure: Optional[str] = "quarter"
     text: Optional[str] = None
@@ -46,6 +51,7 @@ class TempoItem(BaseModel):
 
 class TimeSignatureItem(BaseModel):
     time: float
+    tick: Optional[int] = None
     measure_number: int
     time_signature: Tuple[int, int]
 
@@ -61,6 +67,7 @@ class InstrumentItem(BaseModel):
 
 class EventItem(BaseModel):
     time: float
+    tick: Optional[int] = None
     measure_number: int
     beat: float
     event_type: str
@@ -116,3 +123,26 @@ class Score(BaseModel):
     composer: str
     staff_groups: Dict[str, List[str]] = {}  # Map group name to list of track names
     measure_boundaries: Dict[int, str] = {}  # Measure number -> measure boundary
+    # Resolution of the `tick` of the items, None if they have no ticks
+    ticks_per_quarter: Optional[int] = None
+
+    # Columnar view of `notes`, built on first use and dropped when `notes` changes
+    _note_table: Any = PrivateAttr(default=None)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "notes":
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drop the note table. Call it after mutating `notes` in place."""
+        self._note_table = None
+
+    @property
+    def note_table(self):
+        """The notes as a `NoteTable` (see `harmonics.note_table`)."""
+        if self._note_table is None:
+            from .note_table import NoteTable
+
+            self._note_table = NoteTable(self.notes)
+        return self._note_table
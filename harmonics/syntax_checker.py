@@ -0,0 +1,259 @@
+"""
+Error-recovering syntax checker for ERN documents.
+
+Melody and harmony lines read by the line scanner are valid, and are replaced
+by empty lines (keeping line numbers) before parsing: only the other lines go
+through Lark.
+
+The document is parsed once with the LALR parser. On each syntax error, the
+error is recorded, the parser stack is unwound to the start of the current line
+and lexing resumes on the next line, so every erroneous line is reported in a
+single pass.
+
+Lines that parsed from the start of a line up to a NEWLINE token are valid
+wherever they appear, and are remembered by each `HarmonicsParser`: in its
+later checks they are also replaced by empty lines, so a document that is
+checked again after a few edits only parses the edited lines.
+"""
+
+import difflib
+import re
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from lark import Lark, Token
+from lark.exceptions import UnexpectedCharacters, UnexpectedInput, UnexpectedToken
+
+from .line_scanner import is_scanned_line
+
+LINE_KEYWORDS = [
+    "Composer:",
+    "Piece:",
+    "Time Signature:",
+    "Tempo:",
+    "Instrument:",
+    "Clef:",
+    "Signature:",
+    "Groups:",
+    "tech",
+]
+
+
+class SyntaxErrorInfo(NamedTuple):
+    line: int
+    column: int
+    text: str
+    unexpected: str
+    expected: List[str]
+    suggestion: Optional[str]
+
+    def __str__(self):
+        message = (
+            f"- Error in line {self.line}, column {self.column} '{self.text}': "
+            f"unexpected '{self.unexpected}'"
+        )
+        if self.expected:
+            message += f", expected one of: {', '.join(self.expected)}"
+        if self.suggestion:
+            message += f". Suggestion: {self.suggestion}"
+        return message
+
+
+def _expected_terminals(parser: Lark, names) -> List[str]:
+    expected = []
+    for name in sorted(names):
+        if name == "$END":
+            continue
+        try:
+            pattern = parser.get_terminal(name).pattern
+        except KeyError:
+            expected.append(name)
+            continue
+        if pattern.type == "str":
+            expected.append(repr(pattern.value))
+        else:
+            expected.append(name)
+    return expected
+
+
+def _suggest_fix(parser: Lark, line_text: str, unexpected: str, names) -> Optional[str]:
+    """A likely fix for the error, or None."""
+    for keyword in LINE_KEYWORDS:
+        head = line_text[: len(keyword)]
+        similarity = difflib.SequenceMatcher(None, head, keyword).ratio()
+        if head != keyword and similarity > 0.8:
+            return f"replace '{head}' with '{keyword}'"
+    literals = []
+    for name in names:
+        try:
+            pattern = parser.get_terminal(name).pattern
+        except KeyError:
+            continue
+        if pattern.type == "str":
+            literals.append(pattern.value)
+    if unexpected:
+        matches = difflib.get_close_matches(unexpected, literals, n=1, cutoff=0.6)
+        if matches:
+            return f"replace '{unexpected}' with '{matches[0]}'"
+    if len(literals) == 1:
+        return f"insert '{literals[0]}' before '{unexpected}'"
+    return None
+
+
+# Measure number at the start of melody, harmony and event lines, which does
+# not change whether the line is valid
+LEADING_MEASURE_NUMBER = re.compile(r"^([mhe])\d+(?=\s)")
+
+# Bound of the sets of lines known to be valid, so that they do not grow without limit
+MAX_VALID_LINES = 100000
+
+
+def check_syntax(
+    parser: Lark, text: str, valid_lines: Optional[Set[str]] = None
+) -> List[SyntaxErrorInfo]:
+    """Syntax errors of a prepared document (see `HarmonicsParser.prepare_input`).
+
+    Lines that only differ from an earlier line by their leading measure number
+    (`e12 b1 velocity(p)`, `e13 b1 velocity(p)`) have the same syntax: they are
+    only parsed when that earlier line has an error.
+
+    Lines of `valid_lines` are not parsed again, and the valid lines of the
+    document are added to it. Without it, every line that the line scanner
+    doesn't read is parsed.
+    """
+    lines = text.split("\n")
+    known_lines = valid_lines if valid_lines is not None else ()
+    parsed_lines = [""] * len(lines)
+    first_line_of_shape: Dict[str, int] = {}
+    repeated_lines: List[Tuple[int, str]] = []
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped or stripped in known_lines or is_scanned_line(stripped):
+            continue
+        shape = LEADING_MEASURE_NUMBER.sub(r"\g<1>1", stripped, count=1)
+        if shape in first_line_of_shape:
+            repeated_lines.append((index, shape))
+        else:
+            first_line_of_shape[shape] = index
+            parsed_lines[index] = line
+    errors, valid_line_numbers = _parse_lines(parser, lines, parsed_lines)
+
+    rechecked_lines = [""] * len(lines)
+    for index, shape in repeated_lines:
+        if first_line_of_shape[shape] + 1 in valid_line_numbers:
+            valid_line_numbers.add(index + 1)
+        else:
+            rechecked_lines[index] = lines[index]
+    if any(rechecked_lines):
+        more_errors, more_valid_line_numbers = _parse_lines(
+            parser, lines, rechecked_lines
+        )
+        errors = sorted(errors + more_errors, key=lambda e: (e.line, e.column))
+        valid_line_numbers |= more_valid_line_numbers
+
+    if valid_lines is not None:
+        if len(valid_lines) > MAX_VALID_LINES:
+            valid_lines.clear()
+        valid_lines.update(lines[n - 1].strip() for n in valid_line_numbers)
+    return errors
+
+
+def _parse_lines(
+    parser: Lark, lines: List[str], parsed_lines: List[str]
+) -> Tuple[List[SyntaxErrorInfo], Set[int]]:
+    """Errors and numbers of the valid lines of `parsed_lines`, the other lines
+    of the document being replaced by empty lines."""
+    text = "\n".join(parsed_lines)
+    errors: List[SyntaxErrorInfo] = []
+
+    def on_error(e: UnexpectedInput) -> bool:
+        if isinstance(e, UnexpectedToken):
+            if e.token.type == "$END":
+                return False
+            unexpected = e.token.value
+            names = e.expected
+        elif isinstance(e, UnexpectedCharacters):
+            unexpected = e.char
+            names = e.allowed
+        else:
+            return False
+        line_text = lines[e.line - 1] if 0 < e.line <= len(lines) else ""
+        errors.append(
+            SyntaxErrorInfo(
+                line=e.line,
+                column=e.column,
+                text=line_text.strip(),
+                unexpected=unexpected.strip() or repr(unexpected),
+                expected=_expected_terminals(parser, names),
+                suggestion=_suggest_fix(parser, line_text.strip(), unexpected, names),
+            )
+        )
+
+        # Unwind the parser to the start of the line...
+        _unwind_to_line_start(e.interactive_parser)
+        # ... and skip the rest of the line
+        lexer_state = e.interactive_parser.lexer_thread.state
+        position = lexer_state.line_ctr.char_pos
+        ended_line = isinstance(e, UnexpectedToken) and e.token.type == "NEWLINE"
+        if not ended_line:
+            end_of_line = text.find("\n", position)
+            end_of_line = len(text) if end_of_line < 0 else end_of_line + 1
+            lexer_state.line_ctr.feed(text[position:end_of_line])
+        return True
+
+    try:
+        tree = parser.parse(text, on_error=on_error)
+    except UnexpectedInput as e:
+        tree = None
+        if not errors or (errors[-1].line, errors[-1].column) != (e.line, e.column):
+            line_text = lines[e.line - 1] if 0 < e.line <= len(lines) else ""
+            errors.append(
+                SyntaxErrorInfo(
+                    line=e.line,
+                    column=e.column,
+                    text=line_text.strip(),
+                    unexpected=getattr(getattr(e, "token", None), "value", ""),
+                    expected=_expected_terminals(parser, getattr(e, "expected", ())),
+                    suggestion=None,
+                )
+            )
+    if tree is None:
+        return errors, set()
+    return errors, _valid_line_numbers(tree, parsed_lines, errors)
+
+
+def _unwind_to_line_start(interactive_parser) -> None:
+    """Pop the states of the current line from the stack of the parser."""
+    parser_state = interactive_parser.parser_state
+    try:
+        # The states where a `line` can start are the ones with a goto on it
+        while "line" not in interactive_parser.choices():
+            parser_state.state_stack.pop()
+            parser_state.value_stack.pop()
+    except (AttributeError, IndexError) as e:
+        raise RuntimeError(
+            "The syntax checker does not support the parser state of this "
+            f"version of Lark ({type(e).__name__}: {e})"
+        ) from e
+
+
+def _valid_line_numbers(tree, parsed_lines: List[str], errors) -> Set[int]:
+    """Lines that parsed from the start of a line up to a NEWLINE token."""
+    newline_lines = {
+        child.line
+        for child in tree.children
+        if isinstance(child, Token) and child.type == "NEWLINE"
+    }
+    error_lines = {error.line for error in errors}
+    valid_line_numbers = set()
+    at_line_start = True
+    for line_number, line in enumerate(parsed_lines, start=1):
+        if not line.strip():
+            continue
+        if line_number in error_lines:
+            at_line_start = True
+            continue
+        ends_line = line_number in newline_lines
+        if at_line_start and ends_line:
+            valid_line_numbers.add(line_number)
+        at_line_start = ends_line
+    return valid_line_numbers
@@ -0,0 +1,53 @@
+"""
+Integer tick timebase of a compiled score.
+
+Times in quarters are floats or Fractions depending on where they come from,
+and exporters used to re-guess tuplets from floats. The compiler instead picks
+a resolution (ticks per quarter) in which every note onset and duration of the
+score is an integer: the least common multiple of the denominators of these
+times in quarters. Each compiled item then carries its `tick`, so that
+exporters can compare and convert times with integer arithmetic.
+"""
+
+from fractions import Fraction
+from math import lcm
+from typing import Iterable, Union
+
+Quarters = Union[int, float, Fraction]
+
+# Resolutions above this (unusual tuplets nested in tuplets) are clamped, and
+# times are rounded to the nearest tick
+MAX_TICKS_PER_QUARTER = 10080
+
+
+class Timebase:
+    """Number of integer ticks per quarter note."""
+
+    def __init__(self, ticks_per_quarter: int = 1):
+        self.ticks_per_quarter = ticks_per_quarter
+
+    @classmethod
+    def from_quarters(cls, times: Iterable[Quarters]) -> "Timebase":
+        """Smallest resolution in which all `times` (in quarters) are integers."""
+        ticks_per_quarter = 1
+        for time in times:
+            ticks_per_quarter = lcm(ticks_per_quarter, Fraction(time).denominator)
+            if ticks_per_quarter > MAX_TICKS_PER_QUARTER:
+                return cls(MAX_TICKS_PER_QUARTER)
+        return cls(ticks_per_quarter)
+
+    def ticks(self, quarters: Quarters) -> int:
+        """Time in ticks of a time in quarters, rounded to the nearest tick."""
+        if isinstance(quarters, int):
+            return quarters * self.ticks_per_quarter
+        return round(quarters * self.ticks_per_quarter)
+
+    def quarters(self, ticks: int) -> Fraction:
+        return Fraction(ticks, self.ticks_per_quarter)
+
+    def rescale(self, ticks: int, ticks_per_quarter: int) -> int:
+        """Time in ticks of another resolution (e.g. MIDI ticks), rounded down."""
+        return ticks * ticks_per_quarter // self.ticks_per_quarter
+
+    def __repr__(self):
+        return f"Timebase({self.ticks_per_quarter})"
@@ -0,0 +1,199 @@
+"""
+Interned tables of values derived from raw tokens.
+
+Scores repeat the same few dozen beat indicators (`b1`, `b2.5`, `b3+1/3`),
+pitches and event arguments thousands of times. The tables below compute the value of each distinct
+token once per process and share it across documents. Their hit and miss
+counters are reported by `token_table_stats`.
+
+`SPELLINGS` maps every pitch spelling of the grammar and of music21 (`C#4`,
+`Bb4`, `B-4`, `Fx3`, `E--3`) to its MIDI and diatonic numbers, so that the
+exporters and the voicing engine don't create a music21 `Pitch` for each note.
+"""
+
+import ast
+import copy
+from fractions import Fraction
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple, Union
+
+Beat = Union[int, Fraction]
+
+PITCH_CLASSES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+# Semitones of the accidentals, in the grammar ("b", "x") and music21 ("-") notations
+ACCIDENTALS = {"": 0, "#": 1, "##": 2, "x": 2, "-": -1, "--": -2, "b": -1, "bb": -2}
+
+
+_MISSING = object()
+
+
+class InternTable:
+    """Values computed from raw tokens, kept for the lifetime of the process.
+
+    Values are shared by every caller: tables of mutable values take a `copy`
+    function, applied to the value returned to each caller.
+    """
+
+    def __init__(
+        self, compute: Callable, maxsize: int = 65536, copy: Optional[Callable] = None
+    ):
+        self.compute = compute
+        self.maxsize = maxsize
+        self.copy = copy
+        self.hits = 0
+        self.misses = 0
+        self._values: Dict = {}
+
+    def __call__(self, token: str):
+        value = self._values.get(token, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+        else:
+            self.misses += 1
+            value = self.compute(token)
+            if len(self._values) >= self.maxsize:
+                self._values.clear()
+            self._values[token] = value
+        if self.copy is not None:
+            return self.copy(value)
+        return value
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        self._values.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._values)
+
+
+def _parse_beat_indicator(value: str) -> Tuple[Beat, bool]:
+    # BEAT_INDICATOR: "b" BEAT_NUMBER
+    beat_number = value[1:]
+    if "+" in beat_number:
+        integer_part, fractional_part = beat_number.split("+")
+        num, den = fractional_part.split("/")
+        return int(integer_part) + Fraction(int(num), int(den)), True
+    elif "." not in beat_number:
+        return int(beat_number), True
+    elif Fraction(beat_number).denominator in [2, 3, 4, 5, 6, 8, 10]:
+        return Fraction(beat_number).limit_denominator(10), True
+    elif beat_number.split(".")[-1] in ["33", "66", "67"]:
+        return Fraction(beat_number).limit_denominator(3), True
+    else:
+        from harmonics.commons.utils_beat import to_beat_fraction
+
+        return to_beat_fraction(float(beat_number), False), False
+
+
+class PitchToken(NamedTuple):
+    note: str
+    midi: int
+
+
+def _parse_pitch_token(token: str) -> PitchToken:
+    # NOTELETTER_CAPITALIZED ACCIDENTAL? ABSOLUTE_OCTAVE, e.g. "C5", "Bb4", "Fx3"
+    letter = token[0]
+    octave_start = len(token.rstrip("0123456789"))
+    accidental = token[1:octave_start].replace("x", "##")
+    octave = token[octave_start:]
+    alteration = accidental.count("#") - accidental.count("b")
+    midi = PITCH_CLASSES[letter] + alteration + 12 * (int(octave) + 1)
+    return PitchToken(note=letter + accidental + octave, midi=midi)
+
+
+class Spelling(NamedTuple):
+    midi: int
+    diatonic: int  # As music21's `diatonicNoteNum`: C0 is 1, C4 is 29
+
+
+def _spellings() -> Dict[str, Spelling]:
+    spellings = {}
+    for step, letter in enumerate(PITCH_CLASSES):
+        for accidental, alteration in ACCIDENTALS.items():
+            for octave in range(10):
+                midi = PITCH_CLASSES[letter] + alteration + 12 * (octave + 1)
+                # music21 folds the MIDI numbers out of 0-127 into that range
+                if 0 <= midi <= 127:
+                    spellings[f"{letter}{accidental}{octave}"] = Spelling(
+                        midi=midi, diatonic=step + 1 + 7 * octave
+                    )
+    return spellings
+
+
+SPELLINGS = _spellings()
+
+
+def pitch_spelling(name: str) -> Spelling:
+    """MIDI and diatonic numbers of a pitch name with its octave, e.g. "Bb4".
+
+    Names out of the table (no octave, microtones, MIDI numbers out of 0-127)
+    are read by music21.
+    """
+    spelling = SPELLINGS.get(name)
+    if spelling is None:
+        from music21.pitch import Pitch
+
+        pitch = Pitch(name)
+        spelling = Spelling(midi=pitch.midi, diatonic=pitch.diatonicNoteNum)
+    return spelling
+
+
+def pitch_to_midi(name: str) -> int:
+    """MIDI number of a pitch name with its octave, e.g. "Bb4" is 70."""
+    spelling = SPELLINGS.get(name)
+    if spelling is None:
+        return pitch_spelling(name).midi
+    return spelling.midi
+
+
+def _parse_event_argument(argument: str) -> Any:
+    # EVENT_ARGUMENT: TEMPO_NUMBER | VELOCITY_VALUE, e.g. "120", "mf".
+    # The value is the one of the Python literal, or the text itself, without
+    # evaluating the (untrusted) document as Python code
+    if argument.isascii() and argument.isdigit():
+        # Python literals can't have leading zeros, except for zero itself
+        if argument[0] != "0" or not argument.strip("0"):
+            try:
+                return int(argument)
+            except ValueError:
+                # More digits than sys.get_int_max_str_digits()
+                pass
+        return argument
+    try:
+        return ast.literal_eval(argument)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return argument
+
+
+def _copy_event_argument(value: Any) -> Any:
+    # Literals such as "[1, 2]" evaluate to mutable containers
+    if isinstance(value, (list, dict, set)):
+        return copy.deepcopy(value)
+    return value
+
+
+beat_table = InternTable(_parse_beat_indicator)
+pitch_table = InternTable(_parse_pitch_token)
+event_argument_table = InternTable(_parse_event_argument, copy=_copy_event_argument)
+
+
+def token_table_stats() -> Dict[str, Dict[str, float]]:
+    """Size, hits, misses and hit rate of each token table."""
+    return {
+        name: {
+            "size": len(table),
+            "hits": table.hits,
+            "misses": table.misses,
+            "hit_rate": table.hit_rate,
+        }
+        for name, table in (
+            ("beats", beat_table),
+            ("pitches", pitch_table),
+            ("event_arguments", event_argument_table),
+        )
+    }
@@ -1,5 +1,7 @@
-from typing import List, Optional, Union, Dict, Tuple, Any
-from lark import Tree, Token
+import threading
+from fractions import Fraction
+from typing import List, NamedTuple, Optional, Union, Dict, Tuple, Any
+from lark import Tree, Token, Transformer
 from harmonics.constants import INSTRUMENTS_DICT
 
 from harmonics.models import (
@@ -34,7 +36,6 @@ from harmonics.models import (
     Event,
     Instrument,
     Instruments,
-    AccompanimentVoice,
     Technique,
     TechniqueRange,
     Continuation,
@@ -43,10 +44,10 @@ from harmonics.models import (
     ClefChange,
     ClefLine,
     KeySignature,
-    TextComment,
     StaffGroup,
 )
 from .score import ScoreDocument
+from .token_tables import beat_table, event_argument_table, pitch_table
 
 
 def transform_token(token: Token) -> str:
@@ -349,6 +350,29 @@ def transform_key_change(node: Tree) -> Key:
     return Key(key=key_obj)
 
 
+# ------------------------------
+# Variables
+# ------------------------------
+
+
+class PatternTemplate(NamedTuple):
+    """Beat items of a `@variable`, compiled once when it is declared.
+
+    Each call gets its own list of the shared items, so that adding or removing
+    items in one measure does not change the variable or the other calls. The
+    items themselves are frozen models and are shared, not copied.
+    """
+
+    items: Tuple[BeatItem, ...]
+
+    def instantiate(self) -> List[BeatItem]:
+        return list(self.items)
+
+
+def get_variable(context: Dict[str, Any], variable_name: str) -> List[BeatItem]:
+    return context[variable_name].instantiate()
+
+
 # ------------------------------
 # Measure line transformer
 # ------------------------------
@@ -361,7 +385,7 @@ def transform_harmony_line_content(
     for subchild in node.children:
         if isinstance(subchild, Token) and subchild.type == "VARIABLE_CALLING":
             variable_name = subchild.value[1:]
-            beat_items = context[variable_name]
+            beat_items = get_variable(context, variable_name)
         elif isinstance(subchild, Tree):
             if subchild.data == "chord_beat_1":
                 beat_items.append(transform_beat_chord(subchild))
@@ -369,29 +393,30 @@ def transform_harmony_line_content(
                 beat_items.append(transform_beat_chord(subchild))
             elif subchild.data == "key_change":
                 beat_items.append(transform_key_change(subchild))
-
-        elif isinstance(subchild, Token) and subchild.type == "MEASURE_BOUNDARY":
-            # For simplicity we join the token children
-            phrase_boundary = transform_token(subchild)
     return beat_items
 
 
 def transform_harmony_line(
     node: Tree, context: Dict[str, List[AccompanimentBeat]]
 ) -> Measure:
-    # harmony_line: MEASURE_INDICATOR (chord_beat_1)? (beat_chord | key_change)+ MEASURE_BOUNDARY? NEWLINE
+    # harmony_line: "h" MEASURE_NUMBER harmony_line_content
     measure_number = 0
     beat_items: List[BeatItem] = []
     phrase_boundary = None
     for child in node.children:
         if isinstance(child, Token) and child.type == "MEASURE_INDICATOR":
             measure_number = int(child.value[1:])
+        elif isinstance(child, Token) and child.type == "MEASURE_NUMBER":
+            measure_number = int(child.value)
         elif isinstance(child, Token) and child.type == "VARIABLE_CALLING":
             variable_name = child.value[1:]
-            beat_items = context[variable_name]
+            beat_items = get_variable(context, variable_name)
 
         elif isinstance(child, Tree) and child.data == "harmony_line_content":
             beat_items = transform_harmony_line_content(child, context)
+            for subchild in child.children:
+                if isinstance(subchild, Token) and subchild.type == "PHRASE_BOUNDARY":
+                    phrase_boundary = transform_token(subchild)
     return Measure(
         measure_number=measure_number,
         beat_items=beat_items,
@@ -511,61 +536,44 @@ def transform_absolute_note(
 ) -> AbsoluteMelodyNote:
     from harmonics.constants import TECHNIQUE_DICT, END_PLAYING_STYLE_DICT
 
-    noteletter = ""
-    accidental = ""
-    absolute_octave = None
+    pitch = ""
     techniques = []
     for child in node.children:
-        if isinstance(child, Token) and child.type == "NOTELETTER_CAPITALIZED":
-            noteletter = transform_token(child)
-        elif isinstance(child, Token) and child.type == "ACCIDENTAL":
-            accidental = transform_token(child)
-            accidental = accidental.replace("x", "##")
-        elif isinstance(child, Token) and child.type == "ABSOLUTE_OCTAVE":
-            absolute_octave = transform_token(child)
+        if isinstance(child, Token) and child.type in [
+            "NOTELETTER_CAPITALIZED",
+            "ACCIDENTAL",
+            "ABSOLUTE_OCTAVE",
+        ]:
+            pitch += transform_token(child)
         elif isinstance(child, Token) and child.type == "PLAYING_STYLE":
             techniques.append(TECHNIQUE_DICT[transform_token(child)][0])
         elif isinstance(child, Token) and child.type == "END_PLAYING_STYLE":
             techniques.append(END_PLAYING_STYLE_DICT[transform_token(child)])
 
     return AbsoluteMelodyNote(
-        note=noteletter + accidental + absolute_octave,
+        note=pitch_table(pitch).note,
         beat=beat,
         techniques=techniques,
         is_exact=is_exact,
     )
 
 
+def transform_beat_indicator(value: str) -> Tuple[Union[int, Fraction], bool]:
+    # BEAT_INDICATOR: "b" BEAT_NUMBER, returns (beat, is_exact)
+    return beat_table(value)
+
+
 def transform_beat_note(node: Tree, notes: List[MelodyNote]) -> BeatItem:
     beat = 1
     all_notes = []
     techniques = []
     text_comment = None
     is_exact = False
-    from fractions import Fraction
 
     for token in node.children:
         if isinstance(token, Token):
             if token.type == "BEAT_INDICATOR":
-                if "+" in token.value:
-                    integer_part, fractional_part = token.value[1:].split("+")
-                    integer_part = int(integer_part)
-                    num, den = fractional_part.split("/")
-                    beat = integer_part + Fraction(int(num), int(den))
-                    is_exact = True
-                elif "." not in token.value:
-                    beat = int(token.value[1:])
-                    is_exact = True
-                elif Fraction(token.value[1:]).denominator in [2, 3, 4, 5, 6, 8, 10]:
-                    beat = Fraction(token.value[1:]).limit_denominator(10)
-                    is_exact = True
-                elif token.value[1:].split(".")[-1] in ["33", "66", "67"]:
-                    beat = Fraction(token.value[1:]).limit_denominator(3)
-                    is_exact = True
-                else:
-                    from harmonics.commons.utils_beat import to_beat_fraction
-
-                    beat = to_beat_fraction(float(token.value[1:]), is_exact)
+                beat, is_exact = transform_beat_indicator(token.value)
             elif token.type == "TEXT_COMMENT":
                 text_comment = token.value[1:-1]
             elif token.type == "SILENCE":
@@ -584,12 +592,14 @@ def transform_beat_note(node: Tree, notes: List[MelodyNote]) -> BeatItem:
             techniques += transform_note_techniques(token)
 
     if text_comment is not None:
-        for note in all_notes:
-            note.text_comment = text_comment
+        all_notes = [
+            note.model_copy(update={"text_comment": text_comment})
+            for note in all_notes
+        ]
 
     if len(all_notes) == 1:
-        all_notes[0].techniques += techniques
-        return all_notes
+        note = all_notes[0]
+        return [note.model_copy(update={"techniques": note.techniques + techniques})]
     else:
         for note in all_notes:
             techniques += note.techniques
@@ -657,7 +667,7 @@ def transform_melody_line(
                     return Melody(
                         measure_number=measure_number,
                         voice_name=voice_name,
-                        notes=context[variable_calling],
+                        notes=get_variable(context, variable_calling),
                     )
                 else:
                     raise Exception(
@@ -743,7 +753,7 @@ def transform_variable_declaration_line(
                     and subchild.data == "harmony_line_content"
                 ):
                     beats += transform_harmony_line_content(subchild, context)
-    context[variable_name] = beats
+    context[variable_name] = PatternTemplate(tuple(beats))
     return None
 
 
@@ -826,12 +836,21 @@ def transform_technique_line(node: Tree) -> Technique:
     )
 
 
+def get_line_number(node: Tree) -> Optional[int]:
+    # Without propagate_positions, take the line of the first token
+    if not node.meta.empty:
+        return node.meta.line
+    for token in node.scan_values(lambda value: isinstance(value, Token)):
+        return token.line
+    return None
+
+
 def transform_statement_line(
     node: Tree, context: Dict[str, List[AccompanimentBeat]]
 ) -> Line:
     # statement_line: harmony_line | pedal_line | form_line | note_line | repeat_line | melody_line | accompaniment_line
     child = node
-    line = child.meta.line
+    line = get_line_number(child)
     context["line_number"] = line
     if child.data == "harmony_line":
         return transform_harmony_line(child, context)
@@ -887,13 +906,6 @@ def transform_statement_line(
 
 
 def transform_event_line(node: Tree) -> Events:
-
-    def eval_argument(argument: str) -> str:
-        try:
-            return eval(argument)
-        except Exception as e:
-            return eval('"' + argument + '"')
-
     measure_number = 0
     events: List[Event] = []
     # Parse measure number
@@ -915,7 +927,7 @@ def transform_event_line(node: Tree) -> Events:
                     elif content_child.type == "EVENT_FUNCTION_NAME":
                         event_type = content_child.value
                     elif content_child.type == "EVENT_ARGUMENT":
-                        event_value = eval_argument(content_child.value)
+                        event_value = event_argument_table(content_child.value)
             event = Event(
                 measure_number=measure_number,
                 beat=beat,
@@ -1029,7 +1041,8 @@ def transform_clef_change_line(node: Tree) -> ClefChange:
 # ------------------------------
 
 
-def transform_document(tree: Tree) -> ScoreDocument:
+def transform_numbered_lines(tree: Tree) -> List[Tuple[int, Line]]:
+    """(source line number, Line) of each statement of a document tree."""
     lines = []
     context = {}
     for child in tree.children:
@@ -1039,7 +1052,42 @@ def transform_document(tree: Tree) -> ScoreDocument:
             subchild = child.children[0]
             result = transform_statement_line(subchild, context)
             if result is not None:
-                lines.append(result)
+                lines.append((context["line_number"], result))
+    return lines
 
+
+def transform_document(tree: Tree) -> ScoreDocument:
+    lines = [line for _, line in transform_numbered_lines(tree)]
     document = ScoreDocument(lines=lines)
     return document
+
+
+class LineTransformer(Transformer):
+    """Transformer run by the LALR parser as rules are reduced.
+
+    Each line is transformed as soon as it is parsed, so only the tree of the
+    current line exists at a time. The context of the document being parsed is
+    reset by `reset` before each parse.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def reset(self):
+        self._local.lines = []
+        self._local.context = {}
+
+    def line(self, children):
+        child = children[0]
+        if isinstance(child, Tree):
+            result = transform_statement_line(child, self._local.context)
+            if result is not None:
+                self._local.lines.append(result)
+        return None
+
+    def document(self, children):
+        return ScoreDocument(lines=self._local.lines)
+
+
+line_transformer = LineTransformer()
@@ -2,7 +2,7 @@ import dotenv
 
 dotenv.load_dotenv()
 
-from harmonics import HarmonicsParser
+from harmonics import IncrementalParser
 
 text = r"""
 Composer: Ludwig van Beethoven
@@ -67,6 +67,14 @@ print("Composing ...")
 rntxt = compose_rntxt(prompt, model="gpt-4o")
 print(rntxt)
 
+# The corrected text differs from the composed one on a few lines only:
+# parse both with the same parser so unchanged lines are parsed once
+parser = IncrementalParser()
+try:
+    parser.parse(rntxt)
+except Exception as e:
+    print(f"Composed text does not parse: {e}")
+
 print("Correcting ...")
 from harmonics.llms.generate import correct_rntxt
 
@@ -74,7 +82,6 @@ corrected_rntxt = correct_rntxt(rntxt, model="gpt-4o")
 print(corrected_rntxt)
 
 print("Parsing ...")
-parser = HarmonicsParser()
 tree = parser.parse_to_midi(corrected_rntxt, "test.mid")
 
 # Generate unique uid
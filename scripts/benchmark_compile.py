@@ -0,0 +1,108 @@
+"""
+Benchmark the score compiler on a synthetic document.
+
+The document has 2000 measures and 16 tracks, with a time signature change
+every 8 measures. It has no harmony lines so the voicing engine is not part of
+the measurement.
+
+Usage: python scripts/benchmark_compile.py [n_measures] [n_tracks]
+"""
+
+import sys
+import time
+
+import harmonics.models as models
+import harmonics.exceptions as exceptions
+from harmonics.score import ScoreDocument, MeasureTimeline, bar_duration_in_quarters
+
+
+def legacy_measure_map(lines):
+    """Measure map as computed before the single-pass compiler (O(measures x time signatures))."""
+    measure_map = {}
+    tss = []
+    max_measure = 0
+    for line in lines:
+        if isinstance(line, (models.Melody, models.Events)):
+            max_measure = max(max_measure, line.measure_number)
+    previous_measure_number = 0
+    for line in lines:
+        if isinstance(line, (models.Melody, models.Events)):
+            previous_measure_number = line.measure_number
+        elif isinstance(line, models.TimeSignature):
+            measure_number = line.measure_number
+            if measure_number is None:
+                measure_number = previous_measure_number + 1
+            tss.append((measure_number, line))
+    current_time_in_quarters = 0
+    current_ts = None
+    for i in range(1, max_measure + 1):
+        for measure_number, ts in tss:
+            if measure_number == i:
+                current_ts = ts
+        if current_ts is None:
+            raise exceptions.TimeSignatureNotDeclared(i)
+        start_time = current_time_in_quarters
+        current_time_in_quarters += bar_duration_in_quarters(
+            (current_ts.numerator, current_ts.denominator)
+        )
+        measure_map[i] = (
+            start_time,
+            current_time_in_quarters,
+            (current_ts.numerator, current_ts.denominator),
+        )
+    return measure_map
+
+
+def synthetic_lines(n_measures=2000, n_tracks=16):
+    lines = [models.TimeSignature(numerator=4, denominator=4, measure_number=1)]
+    for measure_number in range(1, n_measures + 1):
+        if measure_number > 1 and measure_number % 8 == 1:
+            numerator = 3 if (measure_number // 8) % 2 else 4
+            lines.append(
+                models.TimeSignature(
+                    numerator=numerator, denominator=4, measure_number=measure_number
+                )
+            )
+        for track in range(1, n_tracks + 1):
+            notes = [
+                models.AbsoluteMelodyNote(beat=beat, note="C5", is_exact=True)
+                for beat in (1, 2, 3)
+            ]
+            lines.append(
+                models.Melody(
+                    measure_number=measure_number,
+                    track_name=f"T{track}",
+                    notes=notes,
+                )
+            )
+    return lines
+
+
+def timeit(function, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+if __name__ == "__main__":
+    n_measures = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_tracks = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    lines = synthetic_lines(n_measures, n_tracks)
+    print(f"{n_measures} measures, {n_tracks} tracks, {len(lines)} lines")
+
+    # Before: notes, events, techniques and clefs each rebuilt the measure map
+    legacy = timeit(lambda: [legacy_measure_map(lines) for _ in range(4)])
+    shared = timeit(lambda: MeasureTimeline.from_lines(lines))
+    print(f"Measure map x4 (legacy): {legacy:.4f} s")
+    print(f"Shared timeline:         {shared:.4f} s ({legacy / shared:.1f}x faster)")
+
+    document = ScoreDocument(lines=lines)
+
+    def compile_document():
+        document.invalidate()
+        document.compile()
+
+    print(f"Full compile:            {timeit(compile_document, repeat=1):.4f} s")
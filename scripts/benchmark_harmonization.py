@@ -0,0 +1,66 @@
+"""
+Benchmark the exact voicing DP against the beam search on a long progression.
+
+The exact DP keeps every voicing of every chord. The beam search extends only
+the `beamWidth` cheapest voicings of each chord and drops forbidden
+transitions, trading optimality for time and memory. For each mode the script
+prints the run time, the peak memory and the cost of the voicing found (the
+exact DP cost is the optimum).
+
+Usage: python scripts/benchmark_harmonization.py [n_chords]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+import music21 as m21
+
+from harmonics.romanyh import voicing
+
+FIGURES = "I ii6 IV V V7 vi I6 ii65 V/V I64 iii viio6".split()
+
+
+def synthetic_progression(n_chords, seed=0):
+    rng = random.Random(seed)
+    figures = ["I"] + [rng.choice(FIGURES) for _ in range(n_chords - 3)] + ["V7", "I"]
+    return [m21.roman.RomanNumeral(figure, "C") for figure in figures]
+
+
+def measure(function):
+    """Result, run time and peak traced memory (MB, measured in a second run)."""
+    start_time = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start_time
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def exact(romanNumerals):
+    costTable = voicing.solveProgression(romanNumerals)
+    return voicing.getBestHarmonization(costTable)
+
+
+if __name__ == "__main__":
+    n_chords = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    romanNumerals = synthetic_progression(n_chords)
+    # Warm the voicing caches so that only the DP is measured
+    exact(romanNumerals[:50])
+    voicing.getVoicingsPerChord(romanNumerals)
+
+    (_, optimum), elapsed, peak = measure(lambda: exact(romanNumerals))
+    print(f"{n_chords} chords")
+    print(f"exact DP:        {elapsed:7.3f} s {peak:7.1f} MB  cost {optimum}")
+    for beamWidth in [128, 32, 8, 2]:
+        (_, cost), elapsed, peak = measure(
+            lambda: voicing.solveProgressionBeam(romanNumerals, beamWidth=beamWidth)
+        )
+        gap = 100 * (cost - optimum) / optimum
+        print(
+            f"beam width {beamWidth:4d}: {elapsed:7.3f} s {peak:7.1f} MB"
+            f"  cost {cost} (+{gap:.1f}%)"
+        )
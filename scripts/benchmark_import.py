@@ -0,0 +1,64 @@
+"""
+Import time regression benchmark.
+
+Runs `python -X importtime` in fresh interpreters and compares the cumulative
+import time of each statement with its budget. music21, symusic and the voicing
+engine must only be imported when an exporter or the harmonization is used.
+
+Usage: python scripts/benchmark_import.py [repeat]
+Exits with status 1 if a statement is over budget.
+"""
+
+import subprocess
+import sys
+
+# Cumulative import time budgets, in milliseconds
+BUDGETS = {
+    "import harmonics": 100,
+    "from harmonics import HarmonicsParser": 600,
+}
+
+LAZY_MODULES = ["music21", "symusic", "harmonics.romanyh", "harmonics.commons.to_midi"]
+
+
+def top_level_imports(statement):
+    """Cumulative import time (ms) of each top-level import of a fresh
+    interpreter running `statement`, and the lazy modules it loaded."""
+    check = f"import sys; print([m for m in {LAZY_MODULES!r} if m in sys.modules])"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"{statement}; {check}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top-level imports are not indented
+        if not name.startswith("  ") and cumulative.strip().isdigit():
+            imports[name.strip()] = int(cumulative) / 1000
+    return imports, result.stdout.strip()
+
+
+def import_time(statement):
+    """Import time of the modules loaded by `statement` (not by the interpreter
+    startup), in ms."""
+    imports, loaded = top_level_imports(statement)
+    startup, _ = top_level_imports("pass")
+    return sum(t for name, t in imports.items() if name not in startup), loaded
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    over_budget = False
+    for statement, budget in BUDGETS.items():
+        best, loaded = min(import_time(statement) for _ in range(repeat))
+        status = "ok" if best <= budget else "OVER BUDGET"
+        over_budget |= best > budget
+        print(f"{statement:<40} {best:7.1f} ms (budget {budget} ms) {status}")
+        if loaded != "[]":
+            print(f"  eagerly imported: {loaded}")
+            over_budget = True
+    sys.exit(1 if over_budget else 0)
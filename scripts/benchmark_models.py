@@ -0,0 +1,80 @@
+"""
+Object creation throughput of the compiled score items.
+
+Compares the validated constructor of NoteItem, ChordItem and EventItem with
+`model_construct` and with `trusted`, the path used by the compiler for values
+it already typed, and times the compilation of a synthetic document.
+
+Usage: python scripts/benchmark_models.py [n_objects]
+"""
+
+import sys
+import time
+from fractions import Fraction
+
+from benchmark_parse import synthetic_document
+
+from harmonics.score_models import ChordItem, EventItem, NoteItem
+
+VALUES = {
+    NoteItem: dict(
+        time=4.5,
+        duration=Fraction(1, 2),
+        chord="V7",
+        key="C",
+        time_signature=(4, 4),
+        pitch="G4",
+        voice_name="v1",
+        track_name="T1",
+        techniques=[],
+        global_techniques=[],
+        measure_number=2,
+        beat=Fraction(3, 2),
+        is_exact=True,
+    ),
+    ChordItem: dict(
+        time=4.0,
+        measure_number=2,
+        beat=1.0,
+        duration=2.0,
+        chord="V7",
+        time_signature=(4, 4),
+        key="C",
+        new_key=False,
+        line_number=12,
+    ),
+    EventItem: dict(
+        time=4.0, measure_number=2, beat=1.0, event_type="velocity", event_value="mf"
+    ),
+}
+
+
+def throughput(create, values, n):
+    """Objects created per second."""
+    start = time.perf_counter()
+    for _ in range(n):
+        create(**values)
+    return n / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for model, values in VALUES.items():
+        validated = throughput(model, values, n)
+        constructed = throughput(model.model_construct, values, n)
+        trusted = throughput(model.trusted, values, n)
+        print(
+            f"{model.__name__:<10} validated {validated:9,.0f}/s   "
+            f"model_construct {constructed:9,.0f}/s   "
+            f"trusted {trusted:9,.0f}/s   x{trusted / validated:.1f}"
+        )
+
+    from harmonics.parser import HarmonicsParser
+
+    document = HarmonicsParser().parse(synthetic_document(200, 8))
+    start = time.perf_counter()
+    compiled = document.compile()
+    print(
+        f"compile    {len(compiled.notes)} notes, {len(compiled.chords)} chords "
+        f"in {time.perf_counter() - start:.2f} s"
+    )
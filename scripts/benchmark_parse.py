@@ -0,0 +1,74 @@
+"""
+Benchmark the two-phase parser against the tree-less parse mode.
+
+The two-phase path builds the parse tree of the whole document (with position
+metadata) and then transforms it. The tree-less path transforms each line while
+the LALR parser reduces it (`HarmonicsParser(treeless=True)`).
+
+Each mode runs in its own subprocess so that peak RSS can be compared.
+
+Usage: python scripts/benchmark_parse.py [n_measures] [n_tracks]
+"""
+
+import resource
+import subprocess
+import sys
+import time
+
+HEADER = """Composer: Benchmark
+Piece: Synthetic
+Time Signature: 4/4
+Tempo: 100
+Instrument: {instruments}
+"""
+
+
+def synthetic_document(n_measures=2000, n_tracks=8):
+    instruments = ", ".join(f"T{track}=piano" for track in range(1, n_tracks + 1))
+    lines = [HEADER.format(instruments=instruments)]
+    for measure_number in range(1, n_measures + 1):
+        lines.append(f"h{measure_number} b1 C: I b2 ii65 b3 V7 b4 I")
+        for track in range(1, n_tracks + 1):
+            lines.append(
+                f"m{measure_number} T{track}.v1 b1 C5 b1.5 D5 b2 E5 b3 G4 C5 b4 L"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def run(mode, n_measures, n_tracks):
+    from harmonics.parser import HarmonicsParser
+
+    document = synthetic_document(n_measures, n_tracks)
+    parser = HarmonicsParser(treeless=mode == "treeless")
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start_time = time.perf_counter()
+    parsed = parser.parse(document)
+    elapsed = time.perf_counter() - start_time
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{mode} {elapsed} {peak_rss - baseline_rss} {len(parsed.lines)}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("two-phase", "treeless"):
+        run(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
+        sys.exit(0)
+
+    n_measures = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_tracks = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f"{n_measures} measures, {n_tracks} tracks")
+    results = {}
+    for mode in ("two-phase", "treeless"):
+        output = subprocess.run(
+            [sys.executable, __file__, mode, str(n_measures), str(n_tracks)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split("\n")[-2]
+        _, elapsed, rss, n_lines = output.split()
+        results[mode] = (float(elapsed), int(rss))
+        print(
+            f"{mode:>10}: {float(elapsed):.3f} s, "
+            f"peak RSS +{int(rss) / 1024:.1f} MB, {n_lines} lines"
+        )
+    speedup = results["two-phase"][0] / results["treeless"][0]
+    print(f"Tree-less parse is {speedup:.1f}x faster")
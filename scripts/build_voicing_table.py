@@ -0,0 +1,67 @@
+"""
+Build the precomputed voicing table used by `harmonics.romanyh.voiceChord`.
+
+The table holds the voicings of common Roman numeral shapes in every key, for
+the settings used by `ScoreDocument.get_progression` (open position, no
+unisons). Chords that are not in the table are still voiced on the fly.
+
+Rebuild it (and bump `voicing_table.TABLE_VERSION` if the enumeration changed)
+whenever `voice_ranges` or `_voiceChord` change.
+
+Usage: python scripts/build_voicing_table.py [output_directory]
+"""
+
+import sys
+import time
+
+import music21 as m21
+
+from harmonics.romanyh.voicing_table import DEFAULT_TABLE_PATH, buildVoicingTable
+
+MAJOR_KEYS = "C G D A E B F# C# F B- E- A- D- G- C-".split()
+MINOR_KEYS = "a e b f# c# g# d# a# d g c f b- e- a-".split()
+
+TRIADS = "I ii iii IV V vi viio i iio III iv v VI VII bII bVI bVII".split()
+SEVENTHS = "I7 ii7 iii7 IV7 V7 vi7 viio7 vii/o7 i7 ii/o7 iv7 VI7".split()
+SECONDARY = (
+    "V/V V7/V viio7/V V/IV V7/IV V/ii V7/ii V/vi V7/vi "
+    "V/iii V7/iii V/iv V7/iv V/VI V7/VI viio7/ii viio7/vi"
+).split()
+AUGMENTED_SIXTHS = ["It6", "Fr43", "Ger65", "N6"]
+
+
+def figures():
+    for triad in TRIADS:
+        for inversion in ["", "6", "64"]:
+            yield triad + inversion
+    for seventh in SEVENTHS:
+        base = seventh[:-1]
+        for inversion in ["7", "65", "43", "42"]:
+            yield base + inversion
+    for figure in SECONDARY:
+        numeral, secondary = figure.split("/", 1)
+        if numeral.endswith("7"):
+            for inversion in ["7", "65", "43", "42"]:
+                yield f"{numeral[:-1]}{inversion}/{secondary}"
+        else:
+            for inversion in ["", "6", "64"]:
+                yield f"{numeral}{inversion}/{secondary}"
+    yield from AUGMENTED_SIXTHS
+
+
+def pitchesList():
+    for key in MAJOR_KEYS + MINOR_KEYS:
+        for figure in figures():
+            try:
+                numeral = m21.roman.RomanNumeral(figure, key)
+            except Exception:
+                continue
+            yield tuple(p.nameWithOctave for p in numeral.pitches)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TABLE_PATH
+    start_time = time.time()
+    n_entries = buildVoicingTable(path, pitchesList())
+    elapsed = time.time() - start_time
+    print(f"{n_entries} chord shapes written to {path} in {elapsed:.1f} s")
@@ -81,3 +81,9 @@ def test_techniques():
     parser = HarmonicsParser()
     tree = parser.parse(text_with_techniques)
     assert tree is not None
+
+
+def test_treeless_parse():
+    document = HarmonicsParser().parse(text_with_events + text)
+    treeless_document = HarmonicsParser(treeless=True).parse(text_with_events + text)
+    assert treeless_document.lines == document.lines
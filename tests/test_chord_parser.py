@@ -11,3 +11,12 @@ def test_positive_chord_parser_with_text_comment():
 
 def test_negative_chord_parser():
     assert not ChordParser().is_chord("not a chord")
+
+
+def test_parsers_share_grammar():
+    assert ChordParser().parser is ChordParser().parser
+
+
+def test_is_chord_many():
+    texts = ["V7/V", "dolce", "It6", "iv62", "V7/V", "a: bII6"]
+    assert ChordParser().is_chord_many(texts) == [True, False, True, True, True, True]
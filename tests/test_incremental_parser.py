@@ -0,0 +1,37 @@
+import pytest
+from pydantic import ValidationError
+
+from harmonics import HarmonicsParser, IncrementalParser
+from harmonics.profiling import profile
+
+text = r"""
+Time Signature: 4/4
+// test
+e1 b1 tempo(110)
+h1 b1 c: I
+h2 b1 c: V
+"""
+
+
+def test_incremental_parse():
+    parser = IncrementalParser()
+    parser.parse(text)
+    edited_text = text.replace("h2 b1 c: V", "h2 b1 c: V7")
+    document = parser.parse(edited_text)
+    assert parser.parsed_lines == 1
+    assert document.lines == HarmonicsParser().parse(edited_text).lines
+    # Unchanged lines are shared with the previous document, and frozen
+    assert parser.parse(edited_text).lines[0] is document.lines[0]
+    with pytest.raises(ValidationError):
+        document.lines[0].line_number = 0
+    assert IncrementalParser(segmented=True).segmented
+
+
+def test_incremental_parse_profiling():
+    parser = IncrementalParser()
+    parser.parse(text)
+    with profile() as profiler:
+        document = parser.parse(text)
+    assert ("parse", "lark parse") in {span.stack for span in profiler.spans}
+    assert profiler.counters["lines"] == len(document.lines)
+    assert profiler.counters["reused lines"] == parser.reused_lines
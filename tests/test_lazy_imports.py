@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+import harmonics.commons.to_midi
+import harmonics.commons.to_mxl
+from harmonics.commons import to_midi, to_mxl
+from harmonics.commons.to_midi import events_to_midi
+
+
+def test_exporters_are_imported_lazily():
+    statement = (
+        "import sys; from harmonics import HarmonicsParser; "
+        "print('music21' in sys.modules or 'symusic' in sys.modules)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", statement], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "False"
+
+
+def test_exporter_names_after_submodule_import():
+    assert callable(to_midi) and to_midi.__module__ == "harmonics.commons.to_midi"
+    assert callable(to_mxl) and to_mxl.__module__ == "harmonics.commons.to_mxl"
+    assert harmonics.commons.to_midi is to_midi
+    assert events_to_midi.__module__ == "harmonics.commons.to_midi"
+
+
+def test_exporters_after_submodule_import(tmp_path):
+    # The submodules are imported before the parser uses the exporters
+    statement = (
+        "import harmonics.commons.to_midi, harmonics.commons.to_mxl; "
+        "from harmonics import HarmonicsParser; "
+        "import sys; text = sys.stdin.read(); parser = HarmonicsParser(); "
+        f"parser.parse_to_midi(text, {str(tmp_path / 'out.mid')!r}); "
+        f"parser.parse_to_mxl(text, {str(tmp_path / 'out.musicxml')!r})"
+    )
+    document = (
+        "Time Signature: 4/4\nInstrument: T1=piano\n"
+        "h1 b1 C: I b3 V\nm1 T1.v1 b1 C5 b2 D5 b3 D5 F#5\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", statement], input=document, text=True, check=True
+    )
+    assert (tmp_path / "out.mid").exists() and (tmp_path / "out.musicxml").exists()
@@ -0,0 +1,53 @@
+import glob
+import os
+import re
+
+from harmonics import HarmonicsParser
+from harmonics.line_scanner import scan_line
+from harmonics.transformer import transform_numbered_lines
+
+DOCUMENTATION_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "documentation"
+)
+
+lines = [
+    "m1 T1.v1 b1 G4 b2 Bb4 b3 D5 b4.5 C5",
+    "m2 T2 b1 C3 E3 G3 b3 R b4 L",
+    "m3 b1 F5 b1+1/3 G5. b1+2/3 A5^ b2 Bb5tr b3.33 A5-",
+    "m4 T1.v1 b1 C5[staccato] b2 D5",
+    'm5 T1.v1 b1 "dolce" C5',
+    "m6 T1.v1 b1 C5_",
+    "h1 b1 g: i b3 V7",
+    "h2 b1 iv6 b2.5 V b3 i ||",
+    "h3 b1 Bb: I b2 ii65 b3 V7/V b4 C:",
+    "h4 b1 Ger65 b2 Cad64 b3 viio7 b4 bVI6/4",
+    "h5 b1 I[add9] b3 V7b9",
+]
+
+
+def corpus():
+    for filepath in glob.glob(os.path.join(DOCUMENTATION_DIRECTORY, "*.md")):
+        with open(filepath) as f:
+            for line in f:
+                if re.match(r"\s*[mh]\d", line):
+                    yield line.strip()
+    yield from lines
+
+
+def test_scanned_lines_match_lark():
+    parser = HarmonicsParser()
+    n_scanned = 0
+    for line in corpus():
+        scanned = scan_line(line, 1)
+        if scanned is None:
+            continue
+        n_scanned += 1
+        tree = parser.parser.parse(parser.prepare_input(line))
+        assert [result for _, result in transform_numbered_lines(tree)] == [scanned]
+    assert n_scanned > 0
+
+
+def test_unusual_lines_fall_back_to_lark():
+    assert scan_line("m4 T1.v1 b1 C5[staccato] b2 D5") is None
+    assert scan_line("h3 b1 Bb: I b2 ii65 b3 V7/V b4 C:") is None
+    assert scan_line("Time Signature: 4/4") is None
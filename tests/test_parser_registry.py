@@ -0,0 +1,14 @@
+import os
+
+from harmonics.parser_registry import is_private_directory
+
+
+def test_cache_directory_is_private(tmp_path):
+    directory = tmp_path / "cache"
+    assert is_private_directory(str(directory))
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+    # Lark cache files are pickles: never load them from a shared directory
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    assert not is_private_directory(str(shared))
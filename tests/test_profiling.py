@@ -0,0 +1,23 @@
+from harmonics import HarmonicsParser
+from harmonics.profiling import get_profiler, profile
+
+text = r"""
+Time Signature: 4/4
+// test
+e1 b1 tempo(110)
+h1 b1 c: I
+h2 b1 c: V
+"""
+
+
+def test_profiling():
+    with profile() as profiler:
+        HarmonicsParser().parse_to_score(text)
+    assert get_profiler() is None
+    totals = profiler.totals()
+    for stage in ["normalise", "lark parse", "transform", "harmonisation"]:
+        assert stage in totals
+    assert profiler.counters["chords"] == 2
+    assert ("parse", "lark parse") in {span.stack for span in profiler.spans}
+    assert "compile;harmonisation" in profiler.folded_stacks()
+    assert len(profiler.chrome_trace()["traceEvents"]) > len(profiler.spans)
@@ -0,0 +1,145 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from music21 import roman
+
+from harmonics.romanyh import voicing, integer_engine, voicing_table
+from harmonics.romanyh import (
+    SegmentCache,
+    generateBestHarmonization,
+    generateParallelHarmonization,
+    generateSegmentedHarmonization,
+    getWorkerPool,
+    splitSegments,
+)
+from harmonics.romanyh.segments import solveSegment
+from harmonics.score_models import ChordItem
+
+
+def _voicings(figure, key):
+    pitches = tuple(p.nameWithOctave for p in roman.RomanNumeral(figure, key).pitches)
+    return voicing.voiceChord(pitches)[::7]
+
+
+def test_integer_engine_matches_music21_costs():
+    for key in ["C", "a", "E-"]:
+        voicings = [
+            v
+            for figure in ["I", "V7", "vi", "viio7", "V/V"]
+            for v in _voicings(figure, key)
+        ]
+        for v in voicings:
+            assert integer_engine.chordCost(v) == voicing.chordCost(v)
+        for v1, v2 in itertools.product(voicings, repeat=2):
+            assert integer_engine.progressionCost(
+                key, v1, v2
+            ) == voicing.progressionCost(key, v1, v2)
+
+
+def test_solve_progression_engines_agree():
+    romanNumerals = [roman.RomanNumeral(f, "C") for f in ["I", "IV", "V7", "I"]]
+    integer = voicing.solveProgression(romanNumerals, engine="integer")
+    music21 = voicing.solveProgression(romanNumerals, engine="music21")
+    batched = voicing.solveProgression(romanNumerals, engine="numpy")
+    assert integer == music21
+    assert batched == integer
+
+
+def test_transition_cost_matrix_matches_scalar_costs():
+    voicings1 = _voicings("V7", "a")
+    voicings2 = _voicings("i", "a") + _voicings("VI", "a")
+    keyInfo = integer_engine.getKeyInfo("a")
+    matrix = integer_engine.transitionCostMatrix(
+        keyInfo,
+        integer_engine.packVoicings(voicings1),
+        integer_engine.packVoicings(voicings2),
+    )
+    for i, v1 in enumerate(voicings1):
+        for j, v2 in enumerate(voicings2):
+            assert matrix[i, j] == integer_engine.progressionCost("a", v1, v2)
+
+
+def test_voicing_table_round_trip(tmp_path):
+    pitches = tuple(p.nameWithOctave for p in roman.RomanNumeral("V65", "g").pitches)
+    voicing_table.buildVoicingTable(str(tmp_path), [pitches])
+    table = voicing_table.VoicingTable.load(str(tmp_path))
+    assert table.get(pitches) == list(voicing._voiceChord(pitches))
+    assert table.get(pitches, closePosition=True) is None
+    assert voicing_table.VoicingTable.load(str(tmp_path / "missing")) is None
+
+
+def test_beam_search_matches_exact_dp_without_pruning():
+    romanNumerals = [
+        roman.RomanNumeral(f, "a") for f in ["i", "iv6", "V7", "VI", "ii/o65", "V", "i"]
+    ]
+    costTable = voicing.solveProgression(romanNumerals)
+    exact = voicing.getBestHarmonization(costTable)
+    assert exact == next(voicing.generateHarmonization(costTable))
+    assert exact == voicing.solveProgressionBeam(romanNumerals, pruneForbidden=False)
+
+    progression, cost = voicing.solveProgressionBeam(romanNumerals, beamWidth=4)
+    assert len(progression) == len(romanNumerals)
+    assert cost >= exact[1]
+
+
+def _chords(figures, key="C"):
+    return [
+        ChordItem(time=i, beat=1, measure_number=i + 1, duration=1, chord=f, key=key)
+        for i, f in enumerate(figures)
+    ]
+
+
+def test_split_segments():
+    assert splitSegments(10, [4, 7]) == [(0, 4), (4, 7), (7, 10)]
+    assert splitSegments(10, [4], window=3) == [(0, 3), (3, 4), (4, 7), (7, 10)]
+    assert splitSegments(0, [4]) == []
+
+
+def test_segmented_harmonization_reuses_unchanged_segments():
+    cache = SegmentCache()
+    chords = _chords(["I", "IV", "V", "I", "vi", "ii6", "V7", "I"])
+    progression = generateSegmentedHarmonization(chords, [4], cache=cache)
+    assert len(progression) == len(chords)
+    assert progression[4:] == voicing.solveProgressionBeam(
+        voicing.getRomanNumerals(chords[3:]),
+        firstVoicing=progression[3],
+        pruneForbidden=False,
+    )[0][1:]
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    # Editing the second segment leaves the first one cached
+    chords[5] = chords[5].model_copy(update={"chord": "IV"})
+    generateSegmentedHarmonization(chords, [4], cache=cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_parallel_harmonization_voices_segments_independently():
+    chords = _chords(["I", "IV", "V", "I"]) + _chords(["i", "iv", "V7", "i"], key="a")
+    expected = solveSegment(chords[:4]) + solveSegment(chords[4:])
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        progression = generateBestHarmonization(
+            chords, segmentStarts=[4], executor=executor
+        )
+    assert progression == expected
+    assert generateParallelHarmonization(chords, [4], workers=2, cache=None) == expected
+
+
+def test_parallel_harmonization_options():
+    chords = _chords(["I", "IV", "V", "I"]) + _chords(["i", "iv", "V7", "i"], key="a")
+    first = _voicings("I", "C")[1]
+    last = _voicings("i", "a")[1]
+    expected = solveSegment(chords[:4], firstVoicing=first, beamWidth=5) + solveSegment(
+        chords[4:], lastVoicing=last, beamWidth=5
+    )
+    progression = generateBestHarmonization(
+        chords,
+        segmentStarts=[4],
+        workers=2,
+        firstVoicing=first,
+        lastVoicing=last,
+        beamWidth=5,
+    )
+    assert progression == expected
+    assert progression[0] == first and progression[-1] == last
+    # The pool is started once and reused by the next calls
+    assert getWorkerPool(2) is getWorkerPool(2)
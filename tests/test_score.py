@@ -1,6 +1,153 @@
 import pytest
+import harmonics.models as models
 from harmonics.parser import HarmonicsParser
+from harmonics.score import ScoreDocument, get_worker_count
+
+
+def _document():
+    return ScoreDocument(
+        lines=[
+            models.TimeSignature(numerator=4, denominator=4),
+            models.Melody(
+                measure_number=1,
+                notes=[models.AbsoluteMelodyNote(beat=1, note="C5", is_exact=True)],
+            ),
+        ]
+    )
+
+
+def test_compile_is_cached():
+    document = _document()
+    compiled = document.compile()
+    assert document.compile() is compiled
+    assert document.notes is compiled.notes
+    assert document.chords is compiled.chords
+    assert len(compiled.notes) == 1
+
+
+def test_compile_invalidated_when_lines_change():
+    document = _document()
+    compiled = document.compile()
+
+    document.lines = document.lines + [
+        models.Melody(
+            measure_number=2,
+            notes=[models.AbsoluteMelodyNote(beat=1, note="D5", is_exact=True)],
+        )
+    ]
+    assert document.compile() is not compiled
+    assert len(document.notes) == 2
+
+    # In-place mutations need an explicit invalidation
+    document.lines.pop()
+    assert len(document.notes) == 2
+    document.invalidate()
+    assert len(document.notes) == 1
+
+
+def test_chord_timeline_lookup():
+    document = HarmonicsParser().parse(
+        "Time Signature: 4/4\n"
+        "h1 b1 C: I b3 V\n"
+        "h2 b1 vi\n"
+        "m1 b1 C5 b2 D5 b3 E5 b4 F5\n"
+        "m2 b1 A4 b4 B4\n"
+    )
+    compiled = document.compile()
+    timeline = compiled.chord_timeline
+    assert len(timeline) == 3
+    assert [n.chord for n in compiled.notes] == ["I", "I", "V", "V", "vi", "vi"]
+    assert timeline.at(3.5).chord == "V"
+    assert timeline.at_beat(2, 1).chord == "vi"
+    assert timeline.at_beat(1, 2.5).chord == "I"
+    assert timeline.at(-1) is None
+    assert timeline.at(8) is None
+    # Times going backwards fall back to a fresh search
+    assert [c.chord for c in timeline.iter_at([0, 4, 2, 7])] == ["I", "vi", "V", "vi"]
 
 
 if __name__ == "__main__":
     pytest.main()
+
+
+def test_note_table():
+    document = HarmonicsParser().parse(
+        "Time Signature: 4/4\n"
+        "h1 b1 C: I b3 V\n"
+        "m1 b1 C5 b2 L b3 D5 F#5 b4 R\n"
+    )
+    notes = document.notes
+    table = document.note_table
+    assert document.note_table is table
+    assert len(table) == len(notes) == 4
+    assert table.to_notes() == notes
+    assert table[2].pitch == ["D5", "F#5"]
+    assert table[2].midi.tolist() == [74, 78]
+    assert table[-1].is_silence and table[-1].pitch is None
+    assert table.column("chord") == ["I", "I", "V", "V"]
+    assert table.duration_numerator.tolist() == [1, 1, 1, 1]
+
+
+def test_ticks():
+    compiled = HarmonicsParser().parse(
+        "Time Signature: 4/4\n"
+        "h1 b1 C: I\n"
+        "m1 b1 C5 b3 D5 b3+1/3 E5 b3+2/3 F5\n"
+        "Time Signature: 3/8\n"
+        "m2 b1 L b2.5 G5\n"
+    ).compile()
+    assert compiled.ticks_per_quarter == 12
+    notes = compiled.notes
+    assert [n.tick for n in notes] == [0, 24, 28, 32, 48, 57]
+    assert [n.duration_ticks for n in notes] == [24, 4, 4, 16, 9, 9]
+    # Each note ends where the next one starts
+    for note, next_note in zip(notes, notes[1:]):
+        assert note.tick + note.duration_ticks == next_note.tick
+    assert compiled.chords[0].tick == 0
+
+
+def test_compiled_items_match_validated_items():
+    compiled = HarmonicsParser().parse(
+        "Time Signature: 4/4\n"
+        "Tempo: 100\n"
+        "h1 b1 C: I b3 V\n"
+        "m1 b1 C5 b2 L b3 D5 F#5 b4 R\n"
+        "e1 b1 velocity(mf)\n"
+    ).compile()
+    for item in compiled.notes + compiled.chords + compiled.events:
+        validated = type(item)(**item.model_dump())
+        assert item == validated
+        assert hash(item) == hash(validated)
+        assert list(item.__dict__) == list(validated.__dict__)
+
+
+def test_global_voicing():
+    text = (
+        "Time Signature: 4/4\n"
+        "h1 b1 C: I b3 V\n"
+        "h2 b1 I b3 IV\n"
+        "h3 b1 a: i b3 V7\n"
+        "h4 b1 i\n"
+    )
+    expected = [
+        ["C3", "C4", "E4", "G4"],
+        ["G2", "B3", "D4", "G4"],
+        ["C3", "C4", "E4", "G4"],
+        ["F2", "C4", "F4", "A4"],
+        ["A2", "C4", "E4", "A4"],
+        ["E3", "B3", "D4", "G#4"],
+        ["A2", "A3", "C4", "A4"],
+    ]
+    document = HarmonicsParser().parse(text)
+    assert [chord.pitches for chord in document.compile().chords] == expected
+    segmented = [chord.pitches for chord in document.compile(segmented=True).chords]
+    # The key change starts a new segment, voiced without looking past it
+    assert segmented != expected
+    score = HarmonicsParser(segmented=True).parse_to_score(text)
+    assert [chord.pitches for chord in score.chords] == segmented
+
+
+@pytest.mark.parametrize("value, workers", [("4", 4), ("0", 1), ("four", 1), ("", 1)])
+def test_worker_count(monkeypatch, value, workers):
+    monkeypatch.setenv("HARMONICS_WORKERS", value)
+    assert get_worker_count() == workers
@@ -0,0 +1,64 @@
+import time
+
+from harmonics import HarmonicsParser
+from harmonics.parser_registry import get_parser
+from harmonics.syntax_checker import check_syntax
+
+text = r"""
+Time Signature: 4/4
+// test
+e1 b1 tempo(110)
+h1 b1 c: I
+h2 b1 c: V
+"""
+
+
+def test_syntax_errors():
+    parser = HarmonicsParser()
+    text_with_errors = text + "h3 b1 c: V7 {\nTime Sginature: 3/4\n"
+    errors = parser.syntax_errors(text_with_errors)
+    assert [error.line for error in errors] == [7, 8]
+    assert errors[1].suggestion == "replace 'Time Sginature:' with 'Time Signature:'"
+    assert parser.syntax_error_report(text) is None
+    # Valid lines are remembered by the parser that checked them
+    assert "Time Signature: 4/4" in parser._valid_lines
+    assert not HarmonicsParser()._valid_lines
+
+
+def _long_document(n_measures):
+    lines = ["Time Signature: 4/4", "Instrument: T1=piano, T2=violin"]
+    for m in range(1, n_measures + 1):
+        lines += [
+            f"e{m} b1 velocity(p) b2 start_crescendo(p) b4 end_crescendo(ff)",
+            f"h{m} b1 C: I b3 V7",
+            f"m{m} T1.v1 b1 C5 E5 G5 b2 L b3 F#4[staccato] b4 Bb4",
+            f"m{m} T2.v1 b1 C3 b3 G2",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def test_syntax_errors_of_repeated_lines():
+    parser = HarmonicsParser()
+    errors = parser.syntax_errors(
+        _long_document(3) + "e4 b1 velocty(p)\ne5 b1 velocty(p)\ne6 b1 velocity(p)\n"
+    )
+    assert [(error.line, error.unexpected) for error in errors] == [
+        (15, "velocty"),
+        (16, "velocty"),
+    ]
+
+
+def test_syntax_check_time():
+    parser = HarmonicsParser()
+    lark_parser = get_parser(
+        parser.grammar_file, parser="lalr", maybe_placeholders=False
+    )
+    document = parser.prepare_input(_long_document(1250))
+    assert len(document.split("\n")) > 5000
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        # A new set of valid lines: nothing is known from earlier checks
+        assert check_syntax(lark_parser, document, valid_lines=set()) == []
+        best = min(best, time.perf_counter() - start)
+    assert best < 0.25
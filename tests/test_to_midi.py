@@ -1,4 +1,12 @@
-from harmonics.commons.to_midi import solve_continuation
+from symusic import Score
+
+from harmonics.commons.to_midi import (
+    DynamicsCurve,
+    TempoMap,
+    events_to_midi,
+    solve_continuation,
+)
+from harmonics.score_models import EventItem
 from harmonics.score_models import NoteItem
 
 
@@ -17,3 +25,52 @@ def test_solve_continuation():
     # ]
     # FIXME : all to_midi utils are broken, output in mxl for the time being
     pass
+
+
+def _event(time, event_type, event_value):
+    return EventItem(
+        time=time,
+        measure_number=1,
+        beat=1,
+        event_type=event_type,
+        event_value=event_value,
+    )
+
+
+def test_dynamics_curve():
+    curve = DynamicsCurve.from_events(
+        [
+            _event(0, "velocity", "p"),
+            _event(4, "start_crescendo", "p"),
+            _event(8, "end_crescendo", "f"),
+            _event(8, "velocity", "f"),
+        ]
+    )
+    times = [-1, 0, 3.5, 4, 6, 8, 12]
+    expected = [80, 40, 40, 40, 55, 70, 70]
+    assert [curve(time) for time in times] == expected
+    assert curve.evaluate(times).tolist() == expected
+    assert DynamicsCurve.from_events([])(3) == 80
+
+
+def test_tempo_map():
+    tempo_map = TempoMap.from_events(
+        [
+            _event(0, "tempo", 100),
+            _event(1, "start_ritardando", 100),
+            _event(2, "end_ritardando", 60),
+        ]
+    )
+    assert tempo_map(1.5) == 80
+    assert tempo_map.changes() == [(0, 100), (1.25, 90), (1.5, 80), (1.75, 70), (2, 60)]
+
+
+def test_velocity_at_note_onset(tmp_path):
+    events = [_event(0, "velocity", "p"), _event(2, "velocity", "f")]
+    # Times in ticks of 2 per quarter
+    note_events = [[0, 60, 1, 1, None, []], [4, 62, 1, 1, None, []]]
+    events_to_midi(
+        note_events, str(tmp_path / "out.mid"), events=events, ticks_per_quarter=2
+    )
+    notes = Score(str(tmp_path / "out.mid")).tracks[0].notes
+    assert [(note.time, note.velocity) for note in notes] == [(0, 40), (960, 70)]
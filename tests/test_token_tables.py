@@ -0,0 +1,59 @@
+from music21.pitch import Pitch
+
+from harmonics import HarmonicsParser
+from harmonics.token_tables import (
+    SPELLINGS,
+    InternTable,
+    beat_table,
+    event_argument_table,
+    pitch_spelling,
+    pitch_table,
+    pitch_to_midi,
+    token_table_stats,
+)
+
+text = r"""
+Time Signature: 4/4
+// test
+e1 b1 tempo(110)
+h1 b1 c: I
+h2 b1 c: V
+"""
+
+
+def test_token_tables():
+    assert pitch_table("Bb4") == ("Bb4", 70)
+    assert pitch_table("Fx3").note == "F##3"
+    hits = beat_table.hits
+    assert beat_table("b2.5") == beat_table("b2.5")
+    assert beat_table.hits > hits
+    assert token_table_stats()["beats"]["hits"] == beat_table.hits
+
+
+def test_intern_table_values():
+    table = InternTable(lambda token: None)
+    assert table("a") is None and table("a") is None
+    assert (table.hits, table.misses) == (1, 1)
+    first = event_argument_table("[1, 2]")
+    first.append(3)
+    assert event_argument_table("[1, 2]") == [1, 2]
+
+
+def test_pitch_spellings():
+    assert pitch_to_midi("Bb4") == pitch_to_midi("B-4") == 70
+    assert pitch_to_midi("Fx3") == pitch_to_midi("F##3") == 55
+    assert pitch_spelling("C4").diatonic == 29
+    # Out of the table
+    assert "G#9" not in SPELLINGS and pitch_to_midi("G#9") == Pitch("G#9").midi
+    for name in ["C0", "E--3", "G#5", "B#8", "G9"]:
+        pitch = Pitch(name)
+        assert SPELLINGS[name] == (pitch.midi, pitch.diatonicNoteNum)
+
+
+def test_event_arguments_are_not_evaluated():
+    assert event_argument_table("120") == 120
+    assert event_argument_table("mf") == "mf"
+    assert event_argument_table("0120") == "0120"
+    assert event_argument_table("__import__('os')") == "__import__('os')"
+    events = HarmonicsParser().parse(text).lines[1].events
+    assert [(e.event_type, e.event_value) for e in events] == [("tempo", 110)]
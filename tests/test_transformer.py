@@ -0,0 +1,18 @@
+import pytest
+from lark import Token, Tree
+from pydantic import ValidationError
+
+from harmonics.models import Chord
+from harmonics.transformer import PatternTemplate, transform_harmony_line_content
+
+
+def test_variable_calls_do_not_share_lists():
+    context = {"a": PatternTemplate((Chord(beat=1, chord="I"),))}
+    call = Tree("harmony_line_content", [Token("VARIABLE_CALLING", "@a")])
+    first = transform_harmony_line_content(call, context)
+    first.append(Chord(beat=3, chord="V"))
+    assert len(transform_harmony_line_content(call, context)) == 1
+    # The calls share the frozen items of the variable
+    assert first[0] is context["a"].items[0]
+    with pytest.raises(ValidationError):
+        first[0].chord = "IV"